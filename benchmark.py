@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарки YouTube History Analyzer
+Запуск: python benchmark.py [имя_бенчмарка ...] [--count N]
+"""
+
+import argparse
+import html
+import json
+import random
+import re
+import string
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+import plotly.graph_objects as go
+from rich.console import Console
+from rich.table import Table
+
+from youtube_analyzer import (YouTubeAnalyzer, DedupIndex, HtmlHistoryFile, JsonArrayFile, extract_video_id,
+                               extract_video_ids, parse_takeout_timestamps, time_columns)
+
+console = Console()
+
+_ID_ALPHABET = string.ascii_letters + string.digits + '_-'
+
+
+def random_video_id(rng: random.Random) -> str:
+    """Случайный ID видео из 11 символов"""
+    return ''.join(rng.choice(_ID_ALPHABET) for _ in range(11))
+
+
+def synthetic_takeout_urls(count: int, seed: int = 42) -> List[str]:
+    """Набор ссылок с распределением форматов, как в реальных выгрузках Takeout"""
+    rng = random.Random(seed)
+    templates = [
+        (0.90, 'https://www.youtube.com/watch?v={}'),
+        (0.04, 'https://music.youtube.com/watch?v={}'),
+        (0.03, 'https://youtu.be/{}'),
+        (0.02, 'https://www.youtube.com/embed/{}'),
+        (0.01, 'https://www.youtube.com/post/{}'),
+    ]
+    weights = [weight for weight, _ in templates]
+    formats = [template for _, template in templates]
+
+    return [rng.choices(formats, weights)[0].format(random_video_id(rng)) for _ in range(count)]
+
+
+def time_call(func: Callable[[], object], repeat: int = 3) -> float:
+    """Лучшее время из нескольких запусков, в секундах"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(func: Callable[[], object]) -> int:
+    """Пиковый объем памяти, выделенной Python за время вызова, в байтах"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def print_results(title: str, count: int, results: Dict[str, float], memory: Optional[Dict[str, int]] = None) -> None:
+    """Таблица результатов с пропускной способностью и ускорением относительно первой строки"""
+    table = Table(title=title)
+    table.add_column('variant', style='cyan')
+    table.add_column('total, s', justify='right')
+    table.add_column('ns/item', justify='right')
+    table.add_column('speedup', justify='right', style='green')
+    if memory:
+        table.add_column('peak, MB', justify='right')
+
+    baseline = next(iter(results.values()))
+    for name, seconds in results.items():
+        row = [name, f'{seconds:.3f}', f'{seconds / count * 1e9:.0f}', f'{baseline / seconds:.1f}x']
+        if memory:
+            row.append(f'{memory[name] / 1024 / 1024:.1f}')
+        table.add_row(*row)
+
+    console.print(table)
+
+
+_LEGACY_PATTERNS = [
+    r'(?:youtube\.com/watch\?v=|youtu\.be/|music\.youtube\.com/watch\?v=)([a-zA-Z0-9_-]{11})',
+    r'youtube\.com/embed/([a-zA-Z0-9_-]{11})',
+    r'youtube\.com/v/([a-zA-Z0-9_-]{11})'
+]
+
+
+def legacy_extract_video_id(url: str) -> Optional[str]:
+    """Прежняя реализация: три отдельных re.search на каждую ссылку"""
+    if not url:
+        return None
+    for pattern in _LEGACY_PATTERNS:
+        match = re.search(pattern, url)
+        if match:
+            return match.group(1)
+    return None
+
+
+def bench_video_id(count: int) -> None:
+    """Извлечение ID видео: прежний код, одно выражение и str.extract"""
+    urls = synthetic_takeout_urls(count)
+    series = pd.Series(urls)
+
+    expected = [legacy_extract_video_id(url) for url in urls]
+    assert [extract_video_id(url) for url in urls] == expected
+    assert extract_video_ids(series).where(lambda ids: ids.notna(), None).tolist() == expected
+
+    results = {
+        'legacy (3x re.search)': time_call(lambda: [legacy_extract_video_id(url) for url in urls]),
+        'single precompiled regex': time_call(lambda: [extract_video_id(url) for url in urls]),
+        'pandas str.extract': time_call(lambda: extract_video_ids(series)),
+    }
+    print_results(f'Video ID extraction, {count:,} URLs', count, results)
+
+
+def synthetic_average_progression(count: int, seed: int = 42) -> List[tuple]:
+    """Прогрессия среднего, как после получения длительностей count видео"""
+    rng = random.Random(seed)
+    progression = []
+    total = 0
+    for video_count in range(1, count + 1):
+        duration = int(rng.lognormvariate(6.2, 1.0))
+        total += duration
+        progression.append((video_count, total / video_count, total, duration, f'Video {video_count}'))
+    return progression
+
+
+def legacy_average_convergence_figure(progression: List[tuple]) -> go.Figure:
+    """Прежняя реализация: все точки на графике и тренд через срез и сумму окна для каждой точки"""
+    video_counts = [point[0] for point in progression]
+    avg_minutes = [round(point[1] / 60, 1) for point in progression]
+    
+    fig = go.Figure(data=[go.Scatter(x=video_counts, y=avg_minutes, mode='lines+markers')])
+    
+    window_size = max(5, len(video_counts) // 10)
+    if window_size > 1 and len(video_counts) > window_size:
+        moving_averages = []
+        for i in range(len(video_counts)):
+            start_idx = max(0, i - window_size + 1)
+            end_idx = i + 1
+            window_avg = sum(avg_minutes[start_idx:end_idx]) / len(avg_minutes[start_idx:end_idx])
+            moving_averages.append(round(window_avg, 1))
+        fig.add_trace(go.Scatter(x=video_counts, y=moving_averages, mode='lines'))
+    return fig
+
+
+def bench_convergence(count: int) -> None:
+    """Построение графика сходимости среднего для count/100, count/10 и count видео"""
+    analyzer = YouTubeAnalyzer()
+    analyzer.console = Console(quiet=True)
+    
+    for size in (count // 100, count // 10, count):
+        analyzer.average_progression = synthetic_average_progression(size)
+        
+        results = {
+            'legacy (slice + sum per point)': time_call(lambda: legacy_average_convergence_figure(analyzer.average_progression), repeat=1),
+            f'pandas rolling, <= {analyzer.plot_max_points:,} points': time_call(analyzer.build_average_convergence_figure),
+        }
+        print_results(f'Average convergence chart, {size:,} fetched videos', size, results)
+
+
+def synthetic_takeout_records(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Записи истории просмотров в виде JSON-выгрузки Takeout, от новых к старым"""
+    rng = random.Random(seed)
+    video_ids = [random_video_id(rng) for _ in range(max(1, count // 4))]
+    channels = [(f'Channel {index} & Co', f'https://www.youtube.com/channel/UC{random_video_id(rng)}') for index in range(500)]
+    moment = datetime(2024, 6, 1)
+
+    records = []
+    for _ in range(count):
+        moment -= timedelta(seconds=rng.randint(30, 3600))
+        video_id = rng.choice(video_ids)
+        channel, channel_url = rng.choice(channels)
+        records.append({
+            'header': 'YouTube Music' if rng.random() < 0.05 else 'YouTube',
+            'title': f'Watched Video {video_id} "<live>"',
+            'titleUrl': f'https://www.youtube.com/watch?v={video_id}',
+            'subtitles': [{'name': channel, 'url': channel_url}],
+            'time': moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+        })
+    return records
+
+
+def render_takeout_html(records: List[Dict[str, Any]]) -> str:
+    """Те же записи в разметке watch-history.html из Takeout (даты в UTC)"""
+    cells = []
+    for record in records:
+        moment = datetime.strptime(record['time'], '%Y-%m-%dT%H:%M:%SZ')
+        channel = record['subtitles'][0]
+        cells.append(
+            '<div class="outer-cell mdl-cell mdl-cell--12-col mdl-shadow--2dp"><div class="mdl-grid">'
+            f'<div class="header-cell mdl-cell mdl-cell--12-col"><p class="mdl-typography--title">{record["header"]}<br></p></div>'
+            '<div class="content-cell mdl-cell mdl-cell--6-col mdl-typography--body-1">'
+            f'Watched&nbsp;<a href="{record["titleUrl"]}">{html.escape(record["title"][len("Watched "):])}</a><br>'
+            f'<a href="{channel["url"]}">{html.escape(channel["name"])}</a><br>'
+            f'{moment:%b} {moment.day}, {moment.year}, {moment.hour % 12 or 12}:{moment:%M:%S}\u202f{moment:%p} UTC<br></div>'
+            '<div class="content-cell mdl-cell mdl-cell--6-col mdl-typography--body-1 mdl-typography--text-right"></div>'
+            '<div class="content-cell mdl-cell mdl-cell--12-col mdl-typography--caption">'
+            '<b>Products:</b><br>&emsp;YouTube<br><b>Why is this here?</b><br>&emsp;This activity was saved to your Google Account'
+            '</div></div></div>'
+        )
+    return ('<html><head><meta charset="UTF-8"><title>Watch history</title></head><body>'
+            '<div class="mdl-grid">' + ''.join(cells) + '</div></body></html>')
+
+
+def bench_html_ingest(count: int) -> None:
+    """Разбор истории из JSON и из HTML-выгрузки: время и пиковая память"""
+    records = synthetic_takeout_records(count)
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = Path(directory) / 'watch-history.json'
+        html_path = Path(directory) / 'watch-history.html'
+        json_path.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding='utf-8')
+        html_path.write_text(render_takeout_html(records), encoding='utf-8')
+        assert list(HtmlHistoryFile(str(html_path))) == records
+
+        def load_json():
+            with open(json_path, 'r', encoding='utf-8') as f:
+                return len(json.load(f))
+
+        variants = {
+            'JSON, json.load of the whole file': load_json,
+            'JSON, streaming array parser': lambda: sum(1 for _ in JsonArrayFile(str(json_path))),
+            'HTML, streaming cell tokenizer': lambda: sum(1 for _ in HtmlHistoryFile(str(html_path))),
+        }
+        results = {name: time_call(func, repeat=1) for name, func in variants.items()}
+        memory = {name: peak_memory(func) for name, func in variants.items()}
+
+        sizes = f'JSON {json_path.stat().st_size / 1024 / 1024:.0f} MB, HTML {html_path.stat().st_size / 1024 / 1024:.0f} MB'
+        print_results(f'Takeout ingest, {count:,} records ({sizes})', count, results, memory)
+
+
+def overlapping_exports(count: int, exports: int = 10, seed: int = 42) -> List[List[Tuple[str, str]]]:
+    """Пары (video_id, time) из нескольких выгрузок: каждая следующая содержит всю историю предыдущей и новый период"""
+    rng = random.Random(seed)
+    video_ids = [random_video_id(rng) for _ in range(max(1, count // 4))]
+    start = datetime(2015, 1, 1)
+    history = [(rng.choice(video_ids), f'{start + timedelta(seconds=index * 97):%Y-%m-%dT%H:%M:%S}.{rng.randrange(1000):03d}Z')
+               for index in range(count)]
+    return [history[:count * (export + 1) // exports] for export in range(exports)]
+
+
+def dedup_with_string_set(exports: List[List[Tuple[str, str]]]) -> int:
+    """Прежняя дедупликация: множество строк video_id_time"""
+    seen_keys = set()
+    for export in exports:
+        for video_id, timestamp in export:
+            seen_keys.add(f"{video_id}_{timestamp}")
+    return len(seen_keys)
+
+
+def dedup_with_index(exports: List[List[Tuple[str, str]]], batch_size: int = 10000) -> int:
+    """Дедупликация через DedupIndex пачками, как в merge_data_sources"""
+    index = DedupIndex()
+    for export in exports:
+        for start in range(0, len(export), batch_size):
+            index.add_batch([(timestamp, video_id) for video_id, timestamp in export[start:start + batch_size]])
+    return len(index)
+
+
+def bench_dedup(count: int) -> None:
+    """Объединение десяти пересекающихся выгрузок: время и пиковая память индекса дедупликации"""
+    exports = overlapping_exports(count)
+    assert dedup_with_string_set(exports) == dedup_with_index(exports)
+
+    variants = {
+        'set of video_id_time strings': lambda: dedup_with_string_set(exports),
+        'DedupIndex (64-bit hashes)': lambda: dedup_with_index(exports),
+    }
+    results = {name: time_call(func, repeat=1) for name, func in variants.items()}
+    memory = {name: peak_memory(func) for name, func in variants.items()}
+
+    total = sum(len(export) for export in exports)
+    print_results(f'Dedup of 10 overlapping exports, {count:,} unique of {total:,} records', total, results, memory)
+
+
+def synthetic_takeout_times(count: int, seed: int = 42) -> List[str]:
+    """Время просмотров в формате Takeout: с долями секунды разной точности и без них"""
+    rng = random.Random(seed)
+    moment = datetime(2024, 6, 1)
+    fractions = ['', '.1', '.123', '.123456']
+
+    times = []
+    for _ in range(count):
+        moment -= timedelta(seconds=rng.randint(30, 3600))
+        times.append(moment.strftime('%Y-%m-%dT%H:%M:%S') + rng.choice(fractions) + 'Z')
+    return times
+
+
+def legacy_time_columns(times: List[str]) -> pd.DataFrame:
+    """Прежний расчёт: pd.to_datetime с выводом формата и аксессоры .dt"""
+    timestamps = pd.to_datetime(pd.Series(times))
+    return pd.DataFrame({
+        'timestamp': timestamps,
+        'date': timestamps.dt.date,
+        'hour': timestamps.dt.hour,
+        'day_of_week': timestamps.dt.day_name(),
+        'month': timestamps.dt.month,
+        'year': timestamps.dt.year
+    })
+
+
+def bench_timestamps(count: int) -> None:
+    """Разбор времени Takeout и производные колонки: pandas против векторного разбора по байтам"""
+    times = synthetic_takeout_times(count)
+    assert legacy_time_columns(times).equals(pd.DataFrame(time_columns(times)))
+
+    results = {
+        'pd.to_datetime (format inference)': time_call(lambda: pd.to_datetime(pd.Series(times))),
+        'parse_takeout_timestamps': time_call(lambda: parse_takeout_timestamps(times)),
+        'legacy columns (.dt accessors)': time_call(lambda: legacy_time_columns(times)),
+        'time_columns (integer calendar)': time_call(lambda: time_columns(times)),
+    }
+    print_results(f'Timestamp parsing and calendar columns, {count:,} records', count, results)
+
+
+BENCHMARKS = {
+    'video_id': (bench_video_id, 1_000_000),
+    'convergence': (bench_convergence, 100_000),
+    'html_ingest': (bench_html_ingest, 200_000),
+    'dedup': (bench_dedup, 1_000_000),
+    'timestamps': (bench_timestamps, 1_000_000),
+}
+
+
+def main():
+    """Главная функция"""
+    parser = argparse.ArgumentParser(description='YouTube History Analyzer benchmarks')
+    parser.add_argument('names', nargs='*', help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument('--count', type=int, help='override the default input size')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+
+    for name in args.names or list(BENCHMARKS):
+        func, default_count = BENCHMARKS[name]
+        func(args.count or default_count)
+
+
+if __name__ == "__main__":
+    main()
@@ -20,8 +20,9 @@ LOCALES = {
         'menu_option_3': '3. Сгенерировать HTML отчет',
         'menu_option_4': '4. Экспорт данных в CSV',
         'menu_option_5': '5. Открыть отчет в браузере',
+        'menu_option_6': '6. Экспорт в Parquet / Arrow',
         'menu_option_0': '0. Выход',
-        'enter_choice': 'Введите ваш выбор (0-5): ',
+        'enter_choice': 'Введите ваш выбор (0-6): ',
         'goodbye': '👋 До свидания!',
         'press_enter': 'Нажмите Enter для продолжения...',
         'app_title': 'YouTube History Analyzer',
@@ -41,9 +42,17 @@ LOCALES = {
         'deduplication': '  Дедупликация записей...',
         'processing_records': '  Обработка записей...',
         'processed_records': '✓ Обработано {count} записей',
+        'streaming_source': '{source}: файл {size} МБ будет прочитан потоково',
+        'parallel_ingest': 'Параллельный разбор: {tasks} частей в {workers} процессах',
+        'memory_usage_title': 'Память DataFrame (компактная схема)',
+        'memory_column': 'Колонка',
+        'memory_before': 'До',
+        'memory_after': 'После',
+        'memory_total': 'Всего',
         
         # Получение длительности
         'getting_durations': 'Получаю длительность для {count} видео...',
+        'getting_durations_all': 'Получаю длительность для всех {count} уникальных видео (сначала самые просматриваемые)...',
         'selected_videos': 'Выбрано {count} видео с доступными каналами',
         'total_available': 'Всего доступных видео: {count}',
         'using_api': '✓ Используется YouTube Data API v3',
@@ -53,6 +62,14 @@ LOCALES = {
         'processed_count': '✅ Обработано: {processed}/{total} видео ({percent:.1f}%) | Осталось: {remaining}',
         'duration_complete': '✓ Получена длительность для {processed} из {total} видео',
         'duration_saved': '✓ Длительности сохранены в: {path}',
+        'duration_cache_summary': '💾 Кэш длительностей: найдено {hits}, недоступных {unavailable}, запрошено {misses}',
+        'http_stats': '🌐 HTTP: запросов {requests}, повторов {retries}, новых соединений {connections}, переиспользовано {reused}',
+        'job_resume_prompt': 'Найдено незавершенное задание: {pending} видео в очереди, {resolved} уже получено. Продолжить?',
+        'job_resumed': '▶ Продолжаю задание: осталось {pending} видео, получено ранее {resolved}',
+        'job_saved': '💾 Прогресс сохранен в {path}: в очереди {count} видео. Запустите получение длительности снова, чтобы продолжить',
+        'job_missing_videos': '⚠ {count} видео из задания нет в загруженной истории — они убраны из очереди',
+        'html_unknown_timezone': '{count} записей в {path} с неизвестным или неоднозначным часовым поясом: их местное время не переведено и учитывается как UTC',
+        'html_unknown_date': '{count} записей в {path} без распознанной даты (незнакомый формат) — они пропущены',
         'file_size': 'Размер файла: {size}',
         
         # Прогрессия среднего значения
@@ -206,6 +223,7 @@ LOCALES = {
         'average_duration': 'Средняя длительность',
         'shortest_video': 'Самое короткое видео',
         'longest_video': 'Самое длинное видео',
+        'duration_std': 'Стандартное отклонение',
         'duration_distribution': '📈 Распределение по длительности',
         'duration_range_0_5': '0-5 мин: {count} видео ({percent:.1f}%)',
         'duration_range_5_15': '5-15 мин: {count} видео ({percent:.1f}%)',
@@ -243,6 +261,10 @@ LOCALES = {
         # Экспорт CSV
         'exporting_csv': 'Экспортирую данные в CSV...',
         'csv_saved': '✓ CSV файл сохранен: {path}',
+        'exporting_columnar': 'Экспортирую данные в {format}...',
+        'columnar_saved': 'Файл сохранен: {path} ({rows:,} строк)',
+        'columnar_format_prompt': 'Формат: parquet или feather (Arrow IPC), по умолчанию parquet: ',
+        'pyarrow_not_installed': 'pyarrow не установлен! Установите: pip install pyarrow',
         
         # Ошибки и предупреждения
         'error_loading_file': '❌ Ошибка загрузки файла: {error}',
@@ -259,7 +281,7 @@ LOCALES = {
         'api_step_3': '3. Включите YouTube Data API v3',
         'api_step_4': '4. Создайте учетные данные (API ключ)',
         'api_step_5': '5. Скопируйте ключ в файл youtube_api_key.txt',
-        'api_quota_info': '📊 Квота API: 10,000 единиц в день (1 единица на видео)',
+        'api_quota_info': '📊 Квота API: 10,000 единиц в день (1 единица на запрос до 50 видео)',
         'api_recommendation': '💡 Рекомендация: начинайте с выборки 100-1000 видео',
         
         # Форматирование времени
@@ -286,13 +308,29 @@ LOCALES = {
         'value': 'Значение',
         'channel': 'Канал',
         'video': 'Видео',
-        'sample_size_prompt': 'Размер выборки для анализа длительности (по умолчанию 100): ',
+        'sample_size_prompt': 'Размер выборки для анализа длительности (по умолчанию 100, all — все уникальные видео): ',
+        'strata_prompt': 'Стратификация выборки: channel, year, hour (Enter — простая случайная выборка): ',
+        'strata_allocation_title': 'Распределение выборки по стратам',
+        'stratum': 'Страта',
+        'stratum_watches': 'Просмотров',
+        'stratum_known': 'Уже известно',
+        'stratum_allocated': 'В выборке',
+        'stratum_other': 'Прочие каналы',
+        'strata_channel': 'каналам',
+        'strata_year': 'годам',
+        'strata_hour': 'часам просмотра',
+        'confidence_interval': '95% доверительный интервал',
+        'stratified_estimate_note': 'Оценка стратифицирована по {strata}',
         'total_videos_label': 'Всего видео',
         'active_days_label': 'Дней активности',
         'avg_videos_per_day_label': 'Среднее видео в день',
         'no_available_videos': 'Нет доступных видео с известными каналами!',
         'report_not_created': 'Отчет еще не создан!',
         'no_files_loaded': 'Не удалось загрузить ни один файл!',
+        'snapshot_loaded': 'Загружено {count:,} записей из снимка (файлы Takeout не менялись)',
+        'incremental_prompt': 'Найден снимок прошлой обработки: {count:,} записей по {since} UTC. Добавить из файлов только более новые записи?',
+        'incremental_appended': 'Добавлено {count:,} новых записей к {existing:,} из снимка',
+        'incremental_no_overlap': 'Новые файлы не пересекаются со снимком у его последней записи (другой аккаунт или другая история) — данные будут обработаны заново целиком',
         'program_interrupted': 'Программа прервана пользователем',
         'monthly_activity': 'Активность по месяцам',
         'day_of_week_activity': 'Активность по дням недели',
@@ -374,8 +412,9 @@ LOCALES = {
         'menu_option_3': '3. Generate HTML report',
         'menu_option_4': '4. Export data to CSV',
         'menu_option_5': '5. Open report in browser',
+        'menu_option_6': '6. Export to Parquet / Arrow',
         'menu_option_0': '0. Exit',
-        'enter_choice': 'Enter your choice (0-5): ',
+        'enter_choice': 'Enter your choice (0-6): ',
         'goodbye': '👋 Goodbye!',
         'press_enter': 'Press Enter to continue...',
         'app_title': 'YouTube History Analyzer',
@@ -395,9 +434,17 @@ LOCALES = {
         'deduplication': '  Deduplicating records...',
         'processing_records': '  Processing records...',
         'processed_records': '✓ Processed {count} records',
+        'streaming_source': '{source}: {size} MB file will be streamed',
+        'parallel_ingest': 'Parallel parsing: {tasks} parts in {workers} processes',
+        'memory_usage_title': 'DataFrame memory (compact schema)',
+        'memory_column': 'Column',
+        'memory_before': 'Before',
+        'memory_after': 'After',
+        'memory_total': 'Total',
         
         # Getting duration
         'getting_durations': 'Getting duration for {count} videos...',
+        'getting_durations_all': 'Getting duration for all {count} unique videos (most watched first)...',
         'selected_videos': 'Selected {count} videos with available channels',
         'total_available': 'Total available videos: {count}',
         'using_api': '✓ Using YouTube Data API v3',
@@ -407,6 +454,14 @@ LOCALES = {
         'processed_count': '✅ Processed: {processed}/{total} videos ({percent:.1f}%) | Remaining: {remaining}',
         'duration_complete': '✓ Got duration for {processed} out of {total} videos',
         'duration_saved': '✓ Durations saved to: {path}',
+        'duration_cache_summary': '💾 Duration cache: {hits} hits, {unavailable} known unavailable, {misses} fetched',
+        'http_stats': '🌐 HTTP: {requests} requests, {retries} retries, {connections} new connections, {reused} reused',
+        'job_resume_prompt': 'Unfinished job found: {pending} videos queued, {resolved} already resolved. Resume?',
+        'job_resumed': '▶ Resuming job: {pending} videos left, {resolved} resolved earlier',
+        'job_saved': '💾 Progress saved to {path}: {count} videos queued. Run duration retrieval again to continue',
+        'job_missing_videos': '⚠ {count} queued videos are not in the loaded history — dropped from the job',
+        'html_unknown_timezone': '{count} records in {path} have an unknown or ambiguous time zone: their local time is not converted and is treated as UTC',
+        'html_unknown_date': '{count} records in {path} have no recognizable date (unfamiliar format) and were skipped',
         'file_size': 'File size: {size}',
         
         # Average progression
@@ -529,6 +584,7 @@ LOCALES = {
         'average_duration': 'Average duration',
         'shortest_video': 'Shortest video',
         'longest_video': 'Longest video',
+        'duration_std': 'Standard deviation',
         'duration_distribution': '📈 Duration distribution',
         'duration_range_0_5': '0-5 min: {count} videos ({percent:.1f}%)',
         'duration_range_5_15': '5-15 min: {count} videos ({percent:.1f}%)',
@@ -566,6 +622,10 @@ LOCALES = {
         # CSV export
         'exporting_csv': 'Exporting data to CSV...',
         'csv_saved': '✓ CSV file saved to: {path}',
+        'exporting_columnar': 'Exporting data to {format}...',
+        'columnar_saved': 'File saved to: {path} ({rows:,} rows)',
+        'columnar_format_prompt': 'Format: parquet or feather (Arrow IPC), default parquet: ',
+        'pyarrow_not_installed': 'pyarrow not installed! Install: pip install pyarrow',
         
         # Errors and warnings
         'error_loading_file': '❌ Error loading file: {error}',
@@ -582,7 +642,7 @@ LOCALES = {
         'api_step_3': '3. Enable YouTube Data API v3',
         'api_step_4': '4. Create credentials (API key)',
         'api_step_5': '5. Copy the key to youtube_api_key.txt file',
-        'api_quota_info': '📊 API quota: 10,000 units per day (1 unit per video)',
+        'api_quota_info': '📊 API quota: 10,000 units per day (1 unit per request of up to 50 videos)',
         'api_recommendation': '💡 Recommendation: start with 100-1000 video sample',
         
         # Time formatting
@@ -641,13 +701,29 @@ LOCALES = {
         'value': 'Value',
         'channel': 'Channel',
         'video': 'Video',
-        'sample_size_prompt': 'Sample size for duration analysis (default 100): ',
+        'sample_size_prompt': 'Sample size for duration analysis (default 100, all — every unique video): ',
+        'strata_prompt': 'Stratify sample by: channel, year, hour (Enter for simple random sample): ',
+        'strata_allocation_title': 'Sample allocation by stratum',
+        'stratum': 'Stratum',
+        'stratum_watches': 'Watches',
+        'stratum_known': 'Already known',
+        'stratum_allocated': 'Sampled',
+        'stratum_other': 'Other channels',
+        'strata_channel': 'channel',
+        'strata_year': 'year',
+        'strata_hour': 'hour of day',
+        'confidence_interval': '95% confidence interval',
+        'stratified_estimate_note': 'Estimate is stratified by {strata}',
         'total_videos_label': 'Total Videos',
         'active_days_label': 'Active Days',
         'avg_videos_per_day_label': 'Average Videos per Day',
         'no_available_videos': 'No available videos with known channels!',
         'report_not_created': 'Report not created yet!',
         'no_files_loaded': 'Failed to load any files!',
+        'snapshot_loaded': 'Loaded {count:,} records from snapshot (Takeout files unchanged)',
+        'incremental_prompt': 'Found a snapshot of the previous run: {count:,} records up to {since} UTC. Add only newer records from the files?',
+        'incremental_appended': 'Appended {count:,} new records to {existing:,} from the snapshot',
+        'incremental_no_overlap': 'The new files do not overlap the snapshot at its latest records (another account or history) — processing everything from scratch',
         'program_interrupted': 'Program interrupted by user',
         'monthly_activity': 'Monthly Activity',
         'day_of_week_activity': 'Day of Week Activity',
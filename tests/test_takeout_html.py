@@ -0,0 +1,51 @@
+"""Разбор даты из HTML-выгрузки Takeout"""
+import io
+
+from youtube_analyzer import iter_takeout_html, parse_takeout_html_time, parse_takeout_timestamps, time_columns
+
+
+def test_known_zone_is_converted_to_utc():
+    assert parse_takeout_html_time('Jan 5, 2024, 3:04:05 PM PST') == '2024-01-05T23:04:05Z'
+    assert parse_takeout_html_time('5 янв. 2024 г., 15:04:05 MSK') == '2024-01-05T12:04:05Z'
+    assert parse_takeout_html_time('Jan 5, 2024, 3:04:05 PM GMT+05:30') == '2024-01-05T09:34:05Z'
+
+
+def test_numeric_dates():
+    assert parse_takeout_html_time('05.01.2024, 15:04:05 MEZ') == '2024-01-05T14:04:05Z'
+    assert parse_takeout_html_time('2024/01/05 15:04:05 JST') == '2024-01-05T06:04:05Z'
+
+
+def test_unlisted_zone_keeps_local_time():
+    # PKT нет в таблице поясов: время не должно молча считаться UTC
+    assert parse_takeout_html_time('Jan 5, 2024, 3:04:05 PM PKT') == '2024-01-05T15:04:05'
+
+
+def test_ambiguous_zone_keeps_local_time():
+    assert parse_takeout_html_time('Jan 5, 2024, 3:04:05 PM IST') == '2024-01-05T15:04:05'
+    assert parse_takeout_html_time('Jan 5, 2024, 3:04:05 PM CST') == '2024-01-05T15:04:05'
+
+
+def test_unlisted_zone_in_document():
+    document = (
+        '<div class="outer-cell"><div class="header-cell"><p>YouTube</p></div>'
+        '<div class="content-cell">Watched <a href="https://www.youtube.com/watch?v=abcdefghijk">Video</a><br>'
+        '<a href="https://www.youtube.com/channel/UC1">Channel</a><br>Jan 5, 2024, 3:04:05 PM PKT<br></div></div>'
+    )
+    records = list(iter_takeout_html(io.StringIO(document)))
+    assert [record['time'] for record in records] == ['2024-01-05T15:04:05']
+
+
+def test_undated_record_is_kept_for_counting():
+    document = (
+        '<div class="outer-cell"><div class="content-cell">Watched '
+        '<a href="https://www.youtube.com/watch?v=abcdefghijk">Video</a><br>someday<br></div></div>'
+    )
+    records = list(iter_takeout_html(io.StringIO(document)))
+    assert records[0]['time'] is None
+
+
+def test_local_times_are_treated_as_utc():
+    values = ['2024-01-05T15:04:05', '2024-01-05T16:00:00.5Z', '2024-01-05T15:04:05+03:00']
+    epoch = parse_takeout_timestamps(values)
+    assert list(epoch) == [1704467045000000000, 1704470400500000000, 1704456245000000000]
+    assert list(time_columns(values)['hour']) == [15, 16, 12]
@@ -4,17 +4,31 @@ YouTube History Analyzer
 YouTube History Analyzer with TUI interface
 """
 
+import argparse
+import heapq
+import html
+import io
 import json
+import math
+import os
 import re
+import sqlite3
+import threading
+import zipfile
+from collections import Counter, deque
+from email.utils import parsedate_to_datetime
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Iterator, TextIO, Iterable, Set, Tuple, Callable
 from rich.console import Console
 from rich.table import Table
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.prompt import Confirm
 import plotly.graph_objects as go
 import plotly.express as px
+from plotly.offline import get_plotlyjs
 from datetime import datetime, timedelta
 import warnings
 import requests
@@ -23,23 +37,1150 @@ import random
 from locales import get_text, get_csv_columns, get_day_of_week, get_month_name
 warnings.filterwarnings('ignore')
 
+# Размер блока чтения при потоковом разборе JSON
+STREAM_CHUNK_SIZE = 1024 * 1024
+# Максимальный размер одной записи, до которого буфер может расти при разборе
+STREAM_MAX_ITEM_SIZE = 16 * 1024 * 1024
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# Разделители между элементами во фрагменте массива (включая открывающую скобку и висячие запятые)
+_JSON_SEPARATORS = re.compile(r'[ \t\n\r,\[]*')
+# Начало записи Takeout: в выгрузке каждая запись открывается ключом "header".
+# Внутри строк кавычки экранированы, поэтому совпадение бывает только на границе записи
+_JSON_RECORD_START = re.compile(rb'\{\s*"header"\s*:')
+
+# Все форматы ссылок на видео в одном выражении (music.youtube.com покрывается youtube.com/watch)
+VIDEO_ID_PATTERN = r'(?:youtube\.com/(?:watch\?v=|embed/|v/)|youtu\.be/)([a-zA-Z0-9_-]{11})'
+_VIDEO_ID_SEARCH = re.compile(VIDEO_ID_PATTERN).search
+# Префикс, с которого начинается подавляющее большинство ссылок в Takeout
+WATCH_URL_PREFIX = 'https://www.youtube.com/watch?v='
+
+# YouTube Data API v3: videos.list принимает до 50 ID за один запрос
+API_VIDEOS_URL = "https://www.googleapis.com/youtube/v3/videos"
+API_BATCH_SIZE = 50
+# Ответы, после которых запрос стоит повторить с задержкой
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Способы вывода графиков в HTML-отчете
+REPORT_CHART_MODES = ('inline', 'iframe')
+
+# Дни недели в порядке pandas dt.day_name() для категориальной колонки
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+# Время в Takeout: YYYY-MM-DDTHH:MM:SS, до 9 цифр долей секунды и Z (ширина строки с запасом)
+TAKEOUT_TIME_WIDTH = 32
+_TIME_SEPARATOR_POSITIONS = [4, 7, 10, 13, 16]
+_TIME_SEPARATORS = np.frombuffer(b'--T::', dtype=np.uint8)
+_TIME_DIGIT_POSITIONS = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+# Позиции до 9 цифр долей секунды и их вес в наносекундах
+_TIME_FRACTION_POSITIONS = np.arange(20, 29)
+_TIME_FRACTION_SCALE = 10 ** np.arange(8, -1, -1, dtype=np.int64)
+NS_PER_SECOND = 1_000_000_000
+
+# Файлы истории внутри выгрузки Takeout: одинаковые пути в распакованной папке и внутри .zip
+TAKEOUT_HISTORY_FILE = "Takeout/YouTube and YouTube Music/history/watch-history.json"
+TAKEOUT_ACTIVITY_FILE = "Takeout/My Activity/YouTube/MyActivity.json"
+# HTML-вариант тех же файлов (формат выгрузки Takeout по умолчанию)
+TAKEOUT_HISTORY_HTML_FILE = "Takeout/YouTube and YouTube Music/history/watch-history.html"
+TAKEOUT_ACTIVITY_HTML_FILE = "Takeout/My Activity/YouTube/MyActivity.html"
+# Архивы Takeout, в том числе многотомные выгрузки takeout-...-001.zip, takeout-...-002.zip
+TAKEOUT_ARCHIVE_PATTERN = "takeout-*.zip"
+# Разделитель архива и файла в пути источника: takeout-...-001.zip!/Takeout/...
+ARCHIVE_MEMBER_SEPARATOR = '!/'
+
+# Дата записи в HTML-выгрузке: "Jan 5, 2024, 10:15:30 PM EST", "5 Jan 2024, 22:15:30 CET" или "5 янв. 2024 г., 22:15:30 MSK"
+_HTML_TIME_SEARCH = re.compile(
+    r'(?:(?:(?P<month_first>[^\W\d_]+)\.?\s+(?P<day_second>\d{1,2}),?|(?P<day_first>\d{1,2})\s+(?P<month_second>[^\W\d_]+)\.?)'
+    r'\s+(?P<year>\d{4})(?:\s*г\.)?'
+    # Числовые даты: DD.MM.YYYY (немецкая и другие локали) и YYYY/MM/DD (японская и другие)
+    r'|(?P<day_dotted>\d{1,2})\.(?P<month_dotted>\d{1,2})\.(?P<year_dotted>\d{4})'
+    r'|(?P<year_slashed>\d{4})/(?P<month_slashed>\d{1,2})/(?P<day_slashed>\d{1,2}))'
+    r',?\s+(?P<hour>\d{1,2}):(?P<minute>\d{2}):(?P<second>\d{2})'
+    r'(?:\s*(?P<ampm>[AaPp]\.?[Mm]\.?))?(?:\s+(?P<zone>[A-Z]{2,5}(?:[+-]\d{1,2}(?::?\d{2})?)?))?'
+).search
+# Разметка карточки записи в HTML-выгрузке: заголовок, текст записи (строки через <br>) и ссылки в нем
+HTML_CELL_MARKER = 'class="outer-cell'
+_HTML_HEADER_SEARCH = re.compile(r'class="header-cell[^"]*">(.*?)</div>', re.S).search
+_HTML_CONTENT_SEARCH = re.compile(r'class="content-cell(?![^"]*text-right)[^"]*">(.*?)</div>', re.S).search
+_HTML_LINE_SPLIT = re.compile(r'<br\s*/?>').split
+_HTML_LINK_SEARCH = re.compile(r'<a\s[^>]*?href="([^"]*)"[^>]*>(.*?)</a>', re.S).search
+_HTML_LINK_SUB = re.compile(r'<a\s[^>]*>.*?</a>', re.S).sub
+_HTML_TAG_SUB = re.compile(r'<[^>]*>').sub
+_HTML_NUMERIC_ZONE = re.compile(r'(?:GMT|UTC)([+-])(\d{1,2}):?(\d{2})?').fullmatch
+# Первые три буквы названия месяца (английские и русские) -> номер месяца
+HTML_MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+    'янв': 1, 'фев': 2, 'мар': 3, 'апр': 4, 'мая': 5, 'май': 5,
+    'июн': 6, 'июл': 7, 'авг': 8, 'сен': 9, 'окт': 10, 'ноя': 11, 'дек': 12
+}
+# Смещение однозначных часовых поясов из HTML-выгрузки относительно UTC, в минутах.
+# Неоднозначных сокращений здесь нет (IST — Индия, Ирландия или Израиль; CST/CDT — США, Китай или Куба):
+# время с ними, как и с неизвестным поясом, остается местным, без перевода в UTC
+HTML_TIMEZONE_OFFSETS = {
+    'UTC': 0, 'GMT': 0, 'WET': 0, 'WEST': 60, 'BST': 60, 'CET': 60, 'CEST': 120, 'MEZ': 60, 'MESZ': 120,
+    'EET': 120, 'EEST': 180, 'MSK': 180, 'JST': 540, 'KST': 540, 'AEST': 600, 'AEDT': 660,
+    'EST': -300, 'EDT': -240, 'MST': -420, 'MDT': -360,
+    'PST': -480, 'PDT': -420, 'AKST': -540, 'AKDT': -480, 'HST': -600
+}
+# Начало текста записи о просмотре в HTML-выгрузке на разных языках аккаунта
+HTML_WATCHED_PREFIXES = ('Watched', 'Вы посмотрели', 'Просмотрено')
+
+# Версия формата снимка обработанной истории: при смене схемы DataFrame старые снимки не подхватываются
+SNAPSHOT_FORMAT_VERSION = 1
+
+# Признаки, по которым можно стратифицировать выборку для оценки времени просмотра
+SAMPLING_STRATA = ('channel', 'year', 'hour')
+HOUR_BUCKET_SIZE = 6
+# Квантиль нормального распределения для 95% доверительного интервала
+CONFIDENCE_Z = 1.96
+
+
+def _iter_fixed_chunks(stream: TextIO, chunk_size: int) -> Iterator[str]:
+    """Чтение блоков текста с исправлением висячих запятых (',]' и ',}')"""
+    pending = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            if pending:
+                yield pending
+            return
+        chunk = pending + chunk
+        # Запятые в конце блока придерживаем: за ними может идти ']' из следующего блока
+        stripped = chunk.rstrip(',')
+        pending = chunk[len(stripped):]
+        yield stripped.replace(',]', ']').replace(',}', '}')
+
+
+def iter_json_array(stream: TextIO, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Any]:
+    """Потоковый разбор JSON-массива верхнего уровня: элементы отдаются по одному"""
+    decoder = json.JSONDecoder()
+    chunks = _iter_fixed_chunks(stream, chunk_size)
+    buf = ''
+    pos = 0
+    expect = '['
+    exhausted = False
+    
+    while True:
+        pos = _JSON_WHITESPACE.match(buf, pos).end()
+        need_more = pos >= len(buf)
+        
+        if not need_more:
+            char = buf[pos]
+            if expect == '[':
+                if char != '[':
+                    raise json.JSONDecodeError("Expecting '['", buf, pos)
+                pos += 1
+                expect = 'value'
+                continue
+            if expect == ',':
+                if char == ',':
+                    pos += 1
+                    expect = 'value'
+                    continue
+                if char == ']':
+                    return
+                raise json.JSONDecodeError("Expecting ',' delimiter", buf, pos)
+            # Висячая запятая перед ']' допускается, как и в обычной загрузке
+            if char == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+                # Число на границе блока могло оборваться — дочитываем
+                need_more = end >= len(buf) and not exhausted
+            except json.JSONDecodeError:
+                # Запись оборвалась на границе блока — дочитываем, иначе JSON действительно битый
+                if exhausted or len(buf) - pos > STREAM_MAX_ITEM_SIZE:
+                    raise
+                need_more = True
+            if not need_more:
+                yield item
+                pos = end
+                expect = ','
+                continue
+        
+        if exhausted:
+            raise json.JSONDecodeError('Unexpected end of data', buf, len(buf))
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+        else:
+            buf = buf[pos:] + chunk
+            pos = 0
+
+
+def extract_video_id(url: Optional[str]) -> Optional[str]:
+    """Извлечение ID видео из URL одним предкомпилированным выражением"""
+    if not url:
+        return None
+    
+    # Отдельный быстрый путь для watch?v= (срез плюс проверка символов) выходит медленнее самого поиска
+    match = _VIDEO_ID_SEARCH(url)
+    return match.group(1) if match else None
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Разбор заголовка Retry-After (секунды или HTTP-дата) в секунды ожидания"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def split_archive_path(path: str) -> Tuple[str, Optional[str]]:
+    """Разделение пути источника на архив и файл внутри него (для обычного файла — путь и None)"""
+    archive, separator, member = str(path).partition(ARCHIVE_MEMBER_SEPARATOR)
+    return (archive, member) if separator else (str(path), None)
+
+
+def find_in_archives(archives: Iterable[Path], member: str) -> Optional[str]:
+    """Поиск файла по всем частям выгрузки Takeout, путь источника вида архив!/файл"""
+    for archive in archives:
+        try:
+            with zipfile.ZipFile(archive) as zf:
+                zf.getinfo(member)
+        except (KeyError, OSError, zipfile.BadZipFile):
+            continue
+        return f"{archive}{ARCHIVE_MEMBER_SEPARATOR}{member}"
+    return None
+
+
+def find_takeout_files(members: Iterable[str], directory: Path = Path('.')) -> List[str]:
+    """Файл истории из каждой выгрузки: распакованные папки Takeout* и архивы takeout-*.zip (по одному на выгрузку).
+    Из вариантов members в каждой выгрузке берется первый найденный"""
+    members = list(members)
+    found = []
+    for folder in sorted(directory.glob('Takeout*')):
+        for member in members:
+            path = folder / member.split('/', 1)[1]
+            if path.is_file():
+                found.append(str(path))
+                break
+    
+    # Части одной многотомной выгрузки отличаются только номером: takeout-20240101T000000Z-001.zip, -002.zip
+    exports = {}
+    for archive in sorted(directory.glob(TAKEOUT_ARCHIVE_PATTERN)):
+        exports.setdefault(re.sub(r'-\d+\.zip$', '', archive.name), []).append(archive)
+    for parts in exports.values():
+        for member in members:
+            path = find_in_archives(parts, member)
+            if path is not None:
+                found.append(path)
+                break
+    return found
+
+
+def source_size(path: str) -> int:
+    """Размер данных источника в байтах (для файла в архиве — после распаковки)"""
+    archive, member = split_archive_path(path)
+    if member is None:
+        return Path(archive).stat().st_size
+    with zipfile.ZipFile(archive) as zf:
+        return zf.getinfo(member).file_size
+
+
+def open_source_text(path: str) -> TextIO:
+    """Открытие источника как текста: файл на диске или файл в .zip с распаковкой на лету, без копии на диске"""
+    archive, member = split_archive_path(path)
+    if member is None:
+        return open(archive, 'r', encoding='utf-8')
+    # Открытый файл архива держит ссылку на zip, поэтому сам ZipFile можно закрыть сразу
+    with zipfile.ZipFile(archive) as zf:
+        return io.TextIOWrapper(zf.open(member), encoding='utf-8')
+
+
+def is_html_source(path: str) -> bool:
+    """Источник в HTML-формате Takeout (иначе JSON)"""
+    return str(path).lower().endswith(('.html', '.htm'))
+
+
+def parse_takeout_html_time(text: str) -> Optional[str]:
+    """Дата из HTML-выгрузки в том же виде, что и поле time в JSON (ISO 8601, UTC; без Z — пояс не распознан)"""
+    match = _HTML_TIME_SEARCH(text.replace('\u202f', ' ').replace('\xa0', ' '))
+    if not match:
+        return None
+    if match.group('year_dotted'):
+        year, month, day = match.group('year_dotted', 'month_dotted', 'day_dotted')
+    elif match.group('year_slashed'):
+        year, month, day = match.group('year_slashed', 'month_slashed', 'day_slashed')
+    else:
+        year, day = match.group('year'), match.group('day_first') or match.group('day_second')
+        month = HTML_MONTHS.get((match.group('month_first') or match.group('month_second'))[:3].lower())
+        if month is None:
+            return None
+    
+    hour = int(match.group('hour'))
+    ampm = match.group('ampm')
+    if ampm:
+        hour = hour % 12 + (12 if ampm[0] in 'Pp' else 0)
+    
+    zone = match.group('zone') or ''
+    offset = HTML_TIMEZONE_OFFSETS.get(zone)
+    if offset is None:
+        numeric = _HTML_NUMERIC_ZONE(zone)
+        if numeric:
+            offset = (int(numeric.group(2)) * 60 + int(numeric.group(3) or 0)) * (1 if numeric.group(1) == '+' else -1)
+    
+    try:
+        local = datetime(int(year), int(month), int(day), hour, int(match.group('minute')), int(match.group('second')))
+    except ValueError:
+        return None
+    if offset is None:
+        # Пояс не распознан или неоднозначен: угадывать смещение нельзя. Местное время пишется без Z,
+        # чтобы такие записи можно было посчитать; при обработке оно считается временем UTC
+        return local.isoformat()
+    return (local - timedelta(minutes=offset)).isoformat() + 'Z'
+
+
+def html_text(fragment: str) -> str:
+    """Текст фрагмента разметки без тегов и HTML-сущностей"""
+    return html.unescape(_HTML_TAG_SUB('', fragment)).replace('\xa0', ' ').strip()
+
+
+def parse_takeout_html_cell(cell: str) -> Optional[Dict[str, Any]]:
+    """Запись из карточки HTML-выгрузки с теми же полями, что и в JSON (header, title, titleUrl, subtitles, time)"""
+    content = _HTML_CONTENT_SEARCH(cell)
+    if not content:
+        return None
+    lines = [line for line in _HTML_LINE_SPLIT(content.group(1)) if line.strip()]
+    if not lines:
+        return None
+    
+    header = _HTML_HEADER_SEARCH(cell)
+    record = {'header': html_text(header.group(1)) if header else ''}
+    
+    # Первая строка — действие и ссылка на видео, следующая ссылка — канал, последняя строка — дата
+    action = html_text(_HTML_LINK_SUB('', lines[0]))
+    video_link = _HTML_LINK_SEARCH(lines[0])
+    if video_link:
+        record['titleUrl'] = html.unescape(video_link.group(1))
+        # Заголовок приводится к виду JSON-выгрузки, где записи о просмотре начинаются с "Watched"
+        if action.startswith(HTML_WATCHED_PREFIXES):
+            action = 'Watched'
+        record['title'] = f"{action} {html_text(video_link.group(2))}".strip()
+    else:
+        record['title'] = action
+    
+    for line in lines[1:]:
+        channel_link = _HTML_LINK_SEARCH(line)
+        if channel_link:
+            record['subtitles'] = [{'name': html_text(channel_link.group(2)), 'url': html.unescape(channel_link.group(1))}]
+            break
+    
+    for line in reversed(lines[1:]):
+        timestamp = parse_takeout_html_time(html_text(line))
+        if timestamp is not None:
+            record['time'] = timestamp
+            break
+    else:
+        if video_link:
+            # Дата в незнакомом формате: запись в историю не попадет, но time=None позволяет ее посчитать
+            record['time'] = None
+    return record
+
+
+def iter_takeout_html(stream: TextIO, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Потоковый разбор HTML-выгрузки Takeout: документ режется на карточки записей без построения дерева"""
+    tail = ''
+    for chunk in iter(lambda: stream.read(chunk_size), ''):
+        cells = (tail + chunk).split(HTML_CELL_MARKER)
+        # Последняя карточка может оборваться на границе блока — она разбирается вместе со следующим
+        tail = HTML_CELL_MARKER + cells.pop() if len(cells) > 1 else cells[0][-len(HTML_CELL_MARKER):]
+        for cell in cells[1:]:
+            record = parse_takeout_html_cell(cell)
+            if record is not None:
+                yield record
+    
+    if tail.startswith(HTML_CELL_MARKER):
+        record = parse_takeout_html_cell(tail)
+        if record is not None:
+            yield record
+
+
+def make_video_url(video_id: str) -> str:
+    """Ссылка на видео по его ID"""
+    return WATCH_URL_PREFIX + video_id
+
+
+def extract_video_ids(urls: pd.Series) -> pd.Series:
+    """Векторное извлечение ID видео из колонки ссылок (NaN, если ID не найден)"""
+    return urls.str.extract(VIDEO_ID_PATTERN, expand=False)
+
+
+def allocate_sample(sizes: Dict[Any, int], stds: Dict[Any, float], known: Dict[Any, int],
+                    capacity: Dict[Any, int], budget: int) -> Dict[Any, int]:
+    """Распределение бюджета запросов по стратам (оптимум Неймана с учетом уже известных значений)"""
+    allocation = dict.fromkeys(sizes, 0)
+    
+    def gain(stratum):
+        # Насколько уменьшится дисперсия оценки N_h^2 * S_h^2 / n_h от еще одного значения в страте
+        count = known[stratum] + allocation[stratum]
+        if count == 0:
+            return math.inf
+        return (sizes[stratum] * stds[stratum]) ** 2 / (count * (count + 1))
+    
+    heap = [(-gain(stratum), -sizes[stratum], index, stratum)
+            for index, stratum in enumerate(sizes) if capacity[stratum] > 0]
+    heapq.heapify(heap)
+    for _ in range(budget):
+        if not heap:
+            break
+        _, negative_size, index, stratum = heapq.heappop(heap)
+        allocation[stratum] += 1
+        if allocation[stratum] < capacity[stratum]:
+            heapq.heappush(heap, (-gain(stratum), negative_size, index, stratum))
+    return allocation
+
+
+def ingest_boundary(timestamps: List[str], video_ids: List[str],
+                    previous: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Граница загруженных данных: последняя секунда (UTC) и ключи дедупликации записей в этой секунде"""
+    if not timestamps:
+        return previous
+    # Время в Takeout — ISO 8601 в UTC, поэтому первые 19 символов сравниваются как строки
+    high_water = max(timestamp[:19] for timestamp in timestamps)
+    keys = [f"{video_id}_{timestamp}" for timestamp, video_id in zip(timestamps, video_ids)
+            if timestamp.startswith(high_water)]
+    if previous is not None and previous['high_water'] == high_water:
+        keys = previous['keys'] + keys
+    return {'high_water': high_water, 'keys': keys}
+
+
+def boundary_candidates(items: Iterable[Dict[str, Any]], source_type: str, high_water: str,
+                        limit: int = 100) -> List[Tuple[str, str]]:
+    """Первые отобранные записи источника не новее границы снимка: (time, video_id) для проверки пересечения"""
+    candidates = []
+    for item in items:
+        timestamp = item.get('time')
+        # Записи идут от новых к старым: более новые, чем граница, пропускаем
+        if timestamp is None or timestamp[:19] > high_water:
+            continue
+        record = project_record(item, source_type)
+        if record is not None:
+            candidates.append(record[:2])
+            if len(candidates) >= limit:
+                break
+    return candidates
+
+
+def parse_takeout_timestamps(values: List[str]) -> np.ndarray:
+    """Время Takeout (ISO 8601 в UTC с Z и разной точностью долей секунды) в наносекунды от эпохи, int64"""
+    parsed = _parse_utc_timestamps(values)
+    if parsed is None:
+        return _parse_timestamps_general(values)
+    
+    # Строки другого вида (местное время HTML-выгрузки без Z, явное смещение пояса) разбирает pandas,
+    # причем только их: остальные остаются на векторном пути
+    epoch, valid = parsed
+    if not valid.all():
+        other = np.flatnonzero(~valid)
+        epoch[other] = _parse_timestamps_general([values[index] for index in other])
+    return epoch
+
+
+def _parse_timestamps_general(values: List[str]) -> np.ndarray:
+    """Общий разбор pandas для любых записей ISO 8601 (время без пояса считается UTC), наносекунды int64"""
+    return pd.to_datetime(pd.Series(values, dtype=object), utc=True).values.view(np.int64)
+
+
+def _parse_utc_timestamps(values: List[str]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Векторный разбор строк вида YYYY-MM-DDTHH:MM:SS[.доли]Z по матрице байтов: (время, маска строк этого вида)"""
+    try:
+        raw = np.array(values, dtype=f'S{TAKEOUT_TIME_WIDTH}')
+    except UnicodeEncodeError:
+        return None
+    chars = raw.view(np.uint8).reshape(len(raw), TAKEOUT_TIME_WIDTH)
+    # Вычитание в uint8: у цифр получается 0-9, у остальных символов — больше 9
+    digits = chars[:, :29] - np.uint8(ord('0'))
+    valid = (chars[:, _TIME_SEPARATOR_POSITIONS] == _TIME_SEPARATORS).all(axis=1) & (digits[:, _TIME_DIGIT_POSITIONS] <= 9).all(axis=1)
+    
+    # Доли секунды — цифры между точкой и Z; после Z строка должна заканчиваться
+    end = 19 + np.argmax(chars[:, 19:30] == ord('Z'), axis=1)
+    rows = np.arange(len(raw))
+    in_fraction = _TIME_FRACTION_POSITIONS < end[:, None]
+    fraction_digits = digits[:, 20:29]
+    valid &= (chars[rows, end] == ord('Z')) & (chars[rows, end + 1] == 0)
+    valid &= ((chars[:, 19] == ord('.')) | (end == 19)) & ((fraction_digits <= 9) | ~in_fraction).all(axis=1)
+    
+    def field(start: int, width: int) -> np.ndarray:
+        value = digits[:, start].astype(np.int64)
+        for position in range(start + 1, start + width):
+            value = value * 10 + digits[:, position]
+        return value
+    
+    year, month, day = field(0, 4), field(5, 2), field(8, 2)
+    hour, minute, second = field(11, 2), field(14, 2), field(17, 2)
+    days = days_from_civil(year, month, day)
+    # Несуществующие даты (2023-02-30, 13-й месяц) не переживают обратного перевода — их разбирает pandas
+    _, parsed_month, parsed_day = civil_from_days(days)
+    valid &= (parsed_month == month) & (parsed_day == day) & (hour < 24) & (minute < 60) & (second < 60)
+    seconds = days * 86400 + hour * 3600 + minute * 60 + second
+    fraction = (fraction_digits * in_fraction).astype(np.int64) @ _TIME_FRACTION_SCALE
+    return seconds * NS_PER_SECOND + fraction, valid
+
+
+def days_from_civil(year: np.ndarray, month: np.ndarray, day: np.ndarray) -> np.ndarray:
+    """Номер дня от 1970-01-01 по дате пролептического григорианского календаря (целочисленно, векторно)"""
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * np.where(month > 2, month - 3, month + 9) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def civil_from_days(days: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Год, месяц и день по номеру дня от 1970-01-01 (обратное к days_from_civil)"""
+    days = days + 719468
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    shifted_month = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * shifted_month + 2) // 5 + 1
+    month = np.where(shifted_month < 10, shifted_month + 3, shifted_month - 9)
+    return year_of_era + era * 400 + (month <= 2), month, day
+
+
+def time_columns(timestamps: List[str]) -> Dict[str, Any]:
+    """Колонки времени истории (timestamp в UTC, date, hour, day_of_week, month, year) целочисленной арифметикой"""
+    epoch = parse_takeout_timestamps(timestamps)
+    seconds = epoch // NS_PER_SECOND
+    days = seconds // 86400
+    year, month, _ = civil_from_days(days)
+    
+    # Объекты date создаются по одному на каждый день истории, а не на каждую запись
+    unique_days, day_index = np.unique(days, return_inverse=True)
+    epoch_date = datetime(1970, 1, 1)
+    dates = np.array([(epoch_date + timedelta(days=int(day))).date() for day in unique_days], dtype=object)
+    
+    return {
+        'timestamp': pd.to_datetime(epoch, utc=True),
+        'date': dates[day_index],
+        'hour': seconds // 3600 % 24,
+        # 1970-01-01 — четверг (индекс 3 при нумерации с понедельника)
+        'day_of_week': np.array(DAY_NAMES, dtype=object)[(days + 3) % 7],
+        'month': month,
+        'year': year
+    }
+
+
+def append_history(base: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """Добавление новых записей к обработанной истории без потери категориальных типов"""
+    if len(new) == 0:
+        return base
+    if len(base) == 0:
+        return new
+    
+    base = base.copy(deep=False)
+    new = new[base.columns].copy(deep=False)
+    for column in base.columns:
+        dtype = base[column].dtype
+        if isinstance(dtype, pd.CategoricalDtype) and dtype != new[column].dtype:
+            # Новые значения дописываются в конец категорий, коды старых строк не пересчитываются
+            extra = new[column].cat.categories.difference(dtype.categories)
+            base[column] = base[column].cat.add_categories(extra)
+            new[column] = new[column].astype(base[column].dtype)
+    return pd.concat([base, new], ignore_index=True)
+
+
+def project_record(item: Dict[str, Any], source_type: str) -> Optional[Tuple[str, str, str, str, str]]:
+    """Фильтрация записи Takeout и выбор полей (time, video_id, title, url, channel); None — запись не нужна"""
+    # Игнорируем YouTube Music
+    if item.get('header') == 'YouTube Music':
+        return None
+    
+    # time=None у записей HTML-выгрузки с нераспознанной датой: их считает и отбрасывает объединение источников
+    url = item.get('titleUrl')
+    if not url or 'time' not in item:
+        return None
+    
+    # Игнорируем записи с music.youtube.com
+    if 'music.youtube.com' in url:
+        return None
+    
+    # Для My Activity берем только Watched записи
+    title = item.get('title', 'Unknown')
+    if source_type == 'my_activity' and not title.startswith('Watched'):
+        return None
+    
+    video_id = extract_video_id(url)
+    if not video_id:
+        return None
+    
+    subtitles = item.get('subtitles')
+    return item['time'], video_id, title, url, subtitles[0].get('name', 'Unknown') if subtitles else 'Unknown'
+
+
+def project_records(items: Iterable[Dict[str, Any]], source_type: str, high_water: Optional[str] = None,
+                    stop_after: int = 0, batch_size: int = 10000) -> Iterator[Tuple[List[tuple], int]]:
+    """Отобранные записи источника пачками: (записи, сколько исходных записей просмотрено)"""
+    batch = []
+    scanned = 0
+    older_in_row = 0
+    for item in items:
+        scanned += 1
+        if scanned == batch_size:
+            yield batch, scanned
+            batch = []
+            scanned = 0
+        
+        # При дозагрузке записи старше границы снимка пропускаются
+        if high_water is not None:
+            timestamp = item.get('time')
+            if timestamp is not None and timestamp[:19] < high_water:
+                # Takeout перечисляет записи от новых к старым: длинная серия старых записей
+                # означает, что дальше в источнике новых нет
+                older_in_row += 1
+                if stop_after and older_in_row >= stop_after:
+                    break
+                continue
+            older_in_row = 0
+        
+        record = project_record(item, source_type)
+        if record is not None:
+            batch.append(record)
+    yield batch, scanned
+
+
+def iter_json_objects(text: str) -> Iterator[Any]:
+    """Разбор подряд идущих элементов из фрагмента JSON-массива"""
+    decoder = json.JSONDecoder()
+    pos = _JSON_SEPARATORS.match(text).end()
+    while pos < len(text) and text[pos] != ']':
+        item, pos = decoder.raw_decode(text, pos)
+        yield item
+        pos = _JSON_SEPARATORS.match(text, pos).end()
+
+
+def json_array_ranges(path: str, chunk_size: int) -> List[Tuple[int, int]]:
+    """Разбиение файла с JSON-массивом записей на диапазоны байтов, начинающиеся с границы записи"""
+    size = Path(path).stat().st_size
+    offsets = [0]
+    with open(path, 'rb') as f:
+        for target in range(chunk_size, size, chunk_size):
+            if target <= offsets[-1]:
+                continue
+            f.seek(target)
+            match = _JSON_RECORD_START.search(f.read(STREAM_CHUNK_SIZE))
+            if match:
+                offsets.append(target + match.start())
+    offsets.append(size)
+    return list(zip(offsets, offsets[1:]))
+
+
+def project_json_range(path: str, source_type: str, start: int, end: int) -> Tuple[List[tuple], int]:
+    """Задача для процесса-обработчика: разбор и фильтрация записей из диапазона байтов файла"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    # Те же исправления висячих запятых, что и при обычной загрузке
+    items = iter_json_objects(text.replace(',]', ']').replace(',}', '}'))
+    return project_source(items, source_type)
+
+
+def project_source(items: Iterable[Dict[str, Any]], source_type: str) -> Tuple[List[tuple], int]:
+    """Задача для процесса-обработчика: все отобранные записи источника и число просмотренных"""
+    records = []
+    scanned = 0
+    for batch, batch_scanned in project_records(items, source_type):
+        records.extend(batch)
+        scanned += batch_scanned
+    return records, scanned
+
+
+class JsonArrayFile:
+    """Ленивый источник записей: JSON-массив, который читается с диска или из архива потоково"""
+    
+    def __init__(self, path: str):
+        self.path = path
+    
+    def __iter__(self) -> Iterator[Any]:
+        with open_source_text(self.path) as f:
+            yield from iter_json_array(f)
+    
+    def __bool__(self) -> bool:
+        return True
+
+
+class HtmlHistoryFile:
+    """Ленивый источник записей: HTML-выгрузка Takeout, которая разбирается потоково"""
+    
+    def __init__(self, path: str):
+        self.path = path
+    
+    def __iter__(self) -> Iterator[Any]:
+        with open_source_text(self.path) as f:
+            yield from iter_takeout_html(f)
+    
+    def __bool__(self) -> bool:
+        return True
+
+
+class DurationCache:
+    """Постоянный кэш длительностей видео в SQLite, включая отметки о недоступных видео"""
+    
+    # Ограничение SQLite на число параметров в одном запросе
+    LOOKUP_CHUNK = 500
+    # Сколько записей копится перед фиксацией транзакции
+    FLUSH_EVERY = 50
+    
+    def __init__(self, path: Path, negative_ttl: float = 7 * 24 * 3600):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self.connection = sqlite3.connect(str(path))
+        # duration = NULL означает, что видео недоступно (удалено, приватное, трансляция)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS durations ('
+            'video_id TEXT PRIMARY KEY, duration INTEGER, fetched_at REAL NOT NULL)'
+        )
+        self.connection.commit()
+        self.pending_writes = 0
+        self.reset_counters()
+    
+    def reset_counters(self) -> None:
+        """Сброс счетчиков попаданий и промахов перед новым запуском"""
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+    
+    def lookup(self, video_ids: Iterable[str]) -> Tuple[Dict[str, int], Set[str]]:
+        """Поиск в кэше: известные длительности и видео с непросроченной отметкой о недоступности"""
+        video_ids = list(video_ids)
+        durations = {}
+        unavailable = set()
+        negative_deadline = time.time() - self.negative_ttl
+        
+        for start in range(0, len(video_ids), self.LOOKUP_CHUNK):
+            chunk = video_ids[start:start + self.LOOKUP_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.connection.execute(
+                f'SELECT video_id, duration, fetched_at FROM durations WHERE video_id IN ({placeholders})', chunk
+            )
+            for video_id, duration, fetched_at in rows:
+                if duration is not None:
+                    durations[video_id] = duration
+                elif fetched_at >= negative_deadline:
+                    unavailable.add(video_id)
+        
+        self.hits += len(durations)
+        self.negative_hits += len(unavailable)
+        self.misses += len(video_ids) - len(durations) - len(unavailable)
+        return durations, unavailable
+    
+    def store(self, video_id: str, duration: Optional[int]) -> None:
+        """Сохранение длительности (None — видео недоступно)"""
+        self.connection.execute(
+            'INSERT OR REPLACE INTO durations (video_id, duration, fetched_at) VALUES (?, ?, ?)',
+            (video_id, duration, time.time())
+        )
+        self.pending_writes += 1
+        if self.pending_writes >= self.FLUSH_EVERY:
+            self.flush()
+    
+    def flush(self) -> None:
+        """Фиксация накопленных записей на диске"""
+        self.connection.commit()
+        self.pending_writes = 0
+
+
+class DurationJob:
+    """Возобновляемое задание на получение длительностей: очередь ID пишется один раз, контрольная точка — курсор"""
+    
+    def __init__(self, path: Path, backend: str, queue: Iterable[str], cursor: int = 0):
+        self.path = path
+        self.cursor_path = path.with_suffix('.cursor')
+        self.backend = backend
+        self.queue = list(queue)
+        self.position = {video_id: index for index, video_id in enumerate(self.queue)}
+        # Все ID до курсора обработаны; done — обработанные после него (пачки завершаются не строго по порядку)
+        self.cursor = cursor
+        self.done = set()
+        self.queue_saved = False
+        self.saved_at = time.monotonic()
+    
+    @classmethod
+    def load(cls, path: Path) -> Optional['DurationJob']:
+        """Загрузка задания, оставшегося от прошлого запуска (None, если его нет или файл поврежден)"""
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            job = cls(path, data['backend'], data['queue'])
+            if job.cursor_path.exists():
+                with open(job.cursor_path, 'r', encoding='utf-8') as f:
+                    job.cursor = min(int(json.load(f)['cursor']), len(job.queue))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        job.queue_saved = True
+        return job
+    
+    @property
+    def pending_count(self) -> int:
+        """Сколько видео осталось в очереди"""
+        return len(self.queue) - self.cursor - len(self.done)
+    
+    @property
+    def processed_count(self) -> int:
+        """Сколько видео уже обработано"""
+        return self.cursor + len(self.done)
+    
+    def pending_ids(self) -> List[str]:
+        """Необработанные ID в порядке очереди"""
+        return [video_id for index, video_id in enumerate(self.queue[self.cursor:], self.cursor) if index not in self.done]
+    
+    def complete(self, video_id: str) -> None:
+        """Видео обработано (результат уже лежит в кэше длительностей): сдвигаем курсор"""
+        index = self.position.get(video_id)
+        if index is None or index < self.cursor:
+            return
+        self.done.add(index)
+        while self.cursor in self.done:
+            self.done.discard(self.cursor)
+            self.cursor += 1
+    
+    def save(self) -> None:
+        """Контрольная точка: очередь записывается один раз, дальше перезаписывается только курсор"""
+        if not self.queue_saved:
+            self.write_file(self.path, {
+                'backend': self.backend,
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'queue': self.queue
+            })
+            self.queue_saved = True
+        # ID после курсора, уже обработанные, при продолжении найдутся в кэше длительностей
+        self.write_file(self.cursor_path, {'cursor': self.cursor, 'saved_at': datetime.now().isoformat(timespec='seconds')})
+        self.saved_at = time.monotonic()
+    
+    @staticmethod
+    def write_file(path: Path, data: Dict[str, Any]) -> None:
+        """Атомарная запись: файл либо старый, либо новый целиком"""
+        temp_path = path.with_name(path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+    
+    def delete(self) -> None:
+        """Удаление файлов завершенного или отмененного задания"""
+        for path in (self.path, self.cursor_path):
+            if path.exists():
+                path.unlink()
+
+
+class HistorySnapshot:
+    """Снимок обработанного DataFrame на диске, привязанный к размерам и времени изменения исходных файлов"""
+    
+    def __init__(self, data_path: Path, meta_path: Path):
+        self.data_path = data_path
+        self.meta_path = meta_path
+    
+    @staticmethod
+    def fingerprint(sources: List[Tuple[str, str]], settings: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Отпечаток входных данных: пути, размеры и время изменения файлов плюс настройки обработки"""
+        files = []
+        for path, source_type in sources:
+            # Для файла внутри архива отпечаток берется с самого архива
+            archive, member = split_archive_path(path)
+            try:
+                stat = Path(archive).stat()
+            except OSError:
+                return None
+            resolved = str(Path(archive).resolve())
+            files.append({
+                'path': resolved if member is None else f"{resolved}{ARCHIVE_MEMBER_SEPARATOR}{member}",
+                'source_type': source_type,
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns
+            })
+        return {'version': SNAPSHOT_FORMAT_VERSION, 'settings': settings, 'sources': files}
+    
+    def read_meta(self) -> Optional[Dict[str, Any]]:
+        """Отпечаток, с которым был сохранен снимок (None, если снимка нет)"""
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def load(self, fingerprint: Optional[Dict[str, Any]]) -> Optional[pd.DataFrame]:
+        """Загрузка снимка, если исходные файлы и настройки не изменились"""
+        meta = self.read_meta()
+        if fingerprint is None or meta is None or meta.get('fingerprint') != fingerprint:
+            return None
+        return self.read_frame(meta)
+    
+    def load_base(self, fingerprint: Optional[Dict[str, Any]]) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+        """Снимок и его граница для дозагрузки: настройки те же, а новые источники уже были в снимке"""
+        meta = self.read_meta()
+        if fingerprint is None or meta is None or not meta.get('boundary'):
+            return None
+        previous = meta.get('fingerprint', {})
+        if previous.get('version') != fingerprint['version'] or previous.get('settings') != fingerprint['settings']:
+            return None
+        # Источник, которого не было в снимке (новый тип или еще один аккаунт), нужно прочитать целиком,
+        # а не только записи новее границы
+        previous_types = Counter(source['source_type'] for source in previous.get('sources', []))
+        if Counter(source['source_type'] for source in fingerprint['sources']) - previous_types:
+            return None
+        df = self.read_frame(meta)
+        return (df, meta['boundary']) if df is not None else None
+    
+    def changed_sources(self, fingerprint: Dict[str, Any]) -> List[int]:
+        """Номера источников отпечатка, которых не было в снимке или которые изменились после него"""
+        meta = self.read_meta() or {}
+        stored = {(source['path'], source['size'], source['mtime_ns'])
+                  for source in meta.get('fingerprint', {}).get('sources', [])}
+        return [index for index, source in enumerate(fingerprint['sources'])
+                if (source['path'], source['size'], source['mtime_ns']) not in stored]
+    
+    def read_frame(self, meta: Dict[str, Any]) -> Optional[pd.DataFrame]:
+        """Чтение DataFrame снимка с возвратом строковых колонок к исходному типу"""
+        try:
+            df = pd.read_pickle(self.data_path)
+            for column in meta.get('object_columns', []):
+                df[column] = df[column].astype(object)
+            return df
+        except Exception:
+            return None
+    
+    def save(self, df: pd.DataFrame, fingerprint: Optional[Dict[str, Any]],
+             boundary: Optional[Dict[str, Any]] = None) -> None:
+        """Атомарная запись снимка: сначала данные, затем отпечаток"""
+        if fingerprint is None:
+            return
+        
+        # Строковые колонки храним как категории: повторяющиеся значения (каналы, даты, пересмотры)
+        # записываются один раз, и снимок читается без поэлементной распаковки строк
+        object_columns = [column for column in df.columns if df[column].dtype == object]
+        encoded = df.copy(deep=False)
+        for column in object_columns:
+            encoded[column] = encoded[column].astype('category')
+        
+        temp_path = self.data_path.with_suffix('.tmp')
+        encoded.to_pickle(temp_path)
+        os.replace(temp_path, self.data_path)
+        
+        meta = {
+            'fingerprint': fingerprint,
+            'object_columns': object_columns,
+            'rows': len(df),
+            'boundary': boundary,
+            'saved_at': datetime.now().isoformat(timespec='seconds')
+        }
+        temp_path = self.meta_path.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.meta_path)
+
+
+class DedupIndex:
+    """Множество ключей дедупликации в виде 64-битных хешей: свежие — в set, остальные — в сортированном массиве numpy"""
+    
+    def __init__(self, flush_size: int = 256 * 1024):
+        self.flush_size = flush_size
+        self.recent = set()
+        self.frozen = np.empty(0, dtype=np.int64)
+    
+    def __len__(self) -> int:
+        return len(self.recent) + len(self.frozen)
+    
+    def add_batch(self, keys: List[Tuple[str, str]]) -> List[bool]:
+        """Добавление пачки ключей (time, video_id); для каждого — True, если он встретился впервые"""
+        # hash() 64-битный и стабилен в пределах процесса, а индекс живет только на время объединения.
+        # Хеш кортежа собирается из закэшированных хешей строк, без склейки ключа video_id_time
+        hashes = np.fromiter(map(hash, keys), dtype=np.int64, count=len(keys))
+        if len(self.frozen):
+            # Ключи из сортированного массива отсеиваются векторно, в цикл попадают только остальные
+            positions = np.searchsorted(self.frozen, hashes).clip(max=len(self.frozen) - 1)
+            candidates = np.flatnonzero(self.frozen[positions] != hashes).tolist()
+        else:
+            candidates = range(len(keys))
+        
+        fresh = [False] * len(keys)
+        values = hashes.tolist()
+        recent = self.recent
+        for index in candidates:
+            value = values[index]
+            if value not in recent:
+                recent.add(value)
+                fresh[index] = True
+        
+        if len(recent) >= self.flush_size:
+            self.flush()
+        return fresh
+    
+    def flush(self) -> None:
+        """Перенос свежих ключей в сортированный массив (8 байт на ключ вместо объекта int в set)"""
+        recent = np.sort(np.fromiter(self.recent, dtype=np.int64, count=len(self.recent)))
+        # Два уже отсортированных участка timsort сливает за линейное время
+        self.frozen = np.sort(np.concatenate([self.frozen, recent]), kind='stable')
+        self.recent.clear()
+
+
+class RunningStats:
+    """Накопительная статистика за O(1) на значение: количество, сумма, среднее и дисперсия (Уэлфорд), минимум и максимум"""
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        # Среднее и сумма квадратов отклонений по алгоритму Уэлфорда (устойчиво к потере точности)
+        self.welford_mean = 0.0
+        self.squared_deviations = 0.0
+        self.minimum = None
+        self.maximum = None
+    
+    def add(self, value: float) -> None:
+        """Учет очередного значения"""
+        self.count += 1
+        self.total += value
+        delta = value - self.welford_mean
+        self.welford_mean += delta / self.count
+        self.squared_deviations += delta * (value - self.welford_mean)
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+    
+    @property
+    def mean(self) -> float:
+        """Среднее значение (точное, пока сумма целочисленная)"""
+        return self.total / self.count if self.count else 0.0
+    
+    @property
+    def variance(self) -> float:
+        """Выборочная дисперсия (0, пока значений меньше двух)"""
+        return self.squared_deviations / (self.count - 1) if self.count > 1 else 0.0
+    
+    @property
+    def std(self) -> float:
+        """Выборочное стандартное отклонение"""
+        return math.sqrt(self.variance)
+
+
+class TokenBucket:
+    """Ограничитель частоты запросов (token bucket), общий для всех потоков одного бэкенда"""
+    
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """Ожидание, пока не появится свободный токен"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class FetchScheduler:
+    """Параллельное получение длительностей: пул потоков, ограничение частоты и выдача результатов по порядку"""
+    
+    def __init__(self, workers: int, rate: float, burst: float = 1.0):
+        self.workers = max(1, workers)
+        self.limiter = TokenBucket(rate, burst)
+        # Устанавливается при завершении map: потоки, спящие в паузе между повторами, сразу выходят
+        self.stopped = threading.Event()
+    
+    def map(self, func: Callable[[Any], Any], tasks: Iterable[Any]) -> Iterator[Tuple[Any, Future]]:
+        """Выполняет func для каждой задачи и отдает пары (задача, future) в порядке постановки"""
+        def run(task):
+            self.limiter.acquire()
+            return func(task)
+        
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        in_flight = deque()
+        try:
+            for task in tasks:
+                in_flight.append((task, executor.submit(run, task)))
+                # Держим ограниченное число задач в очереди, чтобы можно было быстро остановиться
+                if len(in_flight) >= self.workers * 2:
+                    task, future = in_flight.popleft()
+                    future.exception()
+                    yield task, future
+            while in_flight:
+                task, future = in_flight.popleft()
+                future.exception()
+                yield task, future
+        finally:
+            # При досрочной остановке (403, Ctrl-C) не ждем работающие потоки: результаты читает только
+            # основной поток, поэтому оставшиеся задачи отменяются, а паузы между повторами прерываются
+            self.stopped.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
 class YouTubeAnalyzer:
     def __init__(self):
         self.console = Console()
-        self.data = []
-        self.data_sources = {
-            'watch_history': [],
-            'my_activity': []
-        }
+        # Реестр источников: путь к файлу -> (тип источника, записи). Источников одного типа может быть
+        # сколько угодно: несколько аккаунтов или выгрузки за разные даты объединяются с дедупликацией
+        self.data_sources = {}
         self.df = None
         self.video_durations = {}
+        # Версия данных растет при каждом изменении DataFrame или длительностей;
+        # агрегаты пересчитываются, только если версия сменилась
+        self.data_version = 0
+        self.aggregation_cache = {}
+        # Статистика по значениям video_durations, обновляется при каждом новом видео
+        self.duration_stats = RunningStats()
         self.output_dir = Path("youtube_analysis_output")
         self.output_dir.mkdir(exist_ok=True)
+        # Длительности, полученные в прошлых запусках, и отметки о недоступных видео
+        self.duration_cache = DurationCache(self.output_dir / "durations_cache.sqlite")
+        # Число параллельных запросов и ограничение частоты (запросов в секунду) для каждого бэкенда
+        self.fetch_workers = {'api': 4, 'ytdlp': 4, 'selenium': 2}
+        self.fetch_rate_limits = {'api': 10.0, 'ytdlp': 1.0, 'selenium': 1.0}
+        # Общая HTTP-сессия с пулом соединений и параметры повторов для API
+        self.http_session = None
+        self.http_max_retries = 5
+        self.http_backoff_base = 1.0
+        self.http_backoff_cap = 60.0
+        self.http_stats = {'requests': 0, 'retries': 0}
+        self.http_stats_lock = threading.Lock()
+        # Сигнал остановки текущего планировщика, прерывающий паузы между повторами
+        self.fetch_stop = threading.Event()
+        # Курсор задания на получение длительностей сохраняется не чаще раза в checkpoint_interval секунд
+        self.duration_job_path = self.output_dir / "duration_job.json"
+        self.checkpoint_interval = 30.0
+        # Стратификация выборки длительностей (None, 'channel', 'year' или 'hour')
+        self.sampling_strata = None
+        self.strata_top_channels = 20
         self.language = 'ru'  # По умолчанию русский
+        # Файлы больше этого размера (в байтах) не читаются целиком, а разбираются потоково
+        self.streaming_threshold = 50 * 1024 * 1024
+        # Компактная схема DataFrame: категории, узкие целые типы, без колонки url
+        self.compact_schema = False
+        # Снимок обработанной истории: повторный запуск с теми же файлами не разбирает JSON заново
+        self.history_snapshot = HistorySnapshot(self.output_dir / "history_snapshot.pkl", self.output_dir / "history_snapshot.json")
+        # Последняя секунда загруженной истории и ключи записей в ней — с нее продолжается дозагрузка
+        self.history_boundary = None
+        # Разбор больших файлов в пуле процессов: число процессов (1 — без пула) и размер части файла на задачу
+        self.ingest_workers = min(8, os.cpu_count() or 1)
+        self.ingest_chunk_size = 32 * 1024 * 1024
+        # Сколько новых ключей дедупликации держать в множестве, прежде чем переложить их в сортированный массив
+        self.dedup_flush_size = 256 * 1024
+        # Сколько записей подряд старше границы снимка нужно встретить, чтобы перестать читать источник (0 — читать целиком)
+        self.incremental_stop_after = 1000
+        # Больше точек на графике не выводим: длинные ряды прореживаются
+        self.plot_max_points = 5000
+        # Графики в отчете (--report-charts): 'inline' — div в самой странице с общим plotly.js, 'iframe' — отдельные файлы
+        self.report_chart_mode = 'inline'
+        # Встроить plotly.js в report.html (--embed-plotlyjs, автономный файл) вместо ссылки на plotly.min.js рядом
+        self.report_embed_plotlyjs = False
         
         # Новые переменные для отслеживания среднего значения
-        self.average_progression = []  # Список кортежей (количество_видео, среднее_значение)
-        self.average_data = []  # Список словарей с детальной информацией о каждом видео
+        # Список кортежей (количество_видео, среднее_значение, общая_длительность, длительность_видео, название)
+        self.average_progression = []
     
     def select_language(self) -> None:
         """Выбор языка интерфейса"""
@@ -67,7 +1208,11 @@ class YouTubeAnalyzer:
     def load_data_source(self, file_path: str, source_type: str) -> bool:
         """Загрузка данных из указанного источника"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            # HTML всегда разбирается потоково: записи извлекаются только при обработке
+            if is_html_source(file_path) or source_size(file_path) >= self.streaming_threshold:
+                return self.load_data_source_streaming(file_path, source_type)
+            
+            with open_source_text(file_path) as f:
                 content = f.read()
                 
             # Пытаемся исправить возможные проблемы с JSON
@@ -76,7 +1221,7 @@ class YouTubeAnalyzer:
             data = json.loads(content)
             
             if isinstance(data, list):
-                self.data_sources[source_type] = data
+                self.data_sources[file_path] = (source_type, data)
                 self.console.print(f"✓ {get_text(self.language, 'loaded_records', count=len(data), source=source_type)}")
                 return True
             else:
@@ -90,171 +1235,440 @@ class YouTubeAnalyzer:
             self.console.print(f"[red]{get_text(self.language, 'error_loading_source', source=source_type, error=e)}[/red]")
             return False
     
+    def load_data_source_streaming(self, file_path: str, source_type: str) -> bool:
+        """Регистрация источника для потокового чтения (записи разбираются при обработке)"""
+        try:
+            # Проверяем только начало файла: верхний уровень должен быть массивом (или HTML-документом)
+            with open_source_text(file_path) as f:
+                head = f.read(1024).lstrip()
+            
+            html_source = is_html_source(file_path)
+            if not head.startswith('<' if html_source else '['):
+                self.console.print(f"[red]{get_text(self.language, 'error_file_not_list', source=source_type)}[/red]")
+                return False
+            
+            self.data_sources[file_path] = (source_type, HtmlHistoryFile(file_path) if html_source else JsonArrayFile(file_path))
+            size_mb = source_size(file_path) / 1024 / 1024
+            self.console.print(f"✓ {get_text(self.language, 'streaming_source', source=source_type, size=f'{size_mb:.1f}')}")
+            return True
+            
+        except Exception as e:
+            self.console.print(f"[red]{get_text(self.language, 'error_loading_source', source=source_type, error=e)}[/red]")
+            return False
+    
     def load_history(self, file_path: str) -> bool:
         """Загрузка истории просмотров (для обратной совместимости)"""
         return self.load_data_source(file_path, 'watch_history')
     
     def extract_video_id(self, url: str) -> Optional[str]:
         """Извлечение ID видео из URL"""
-        if not url:
-            return None
-            
-        # Паттерны для различных форматов URL YouTube
-        patterns = [
-            r'(?:youtube\.com/watch\?v=|youtu\.be/|music\.youtube\.com/watch\?v=)([a-zA-Z0-9_-]{11})',
-            r'youtube\.com/embed/([a-zA-Z0-9_-]{11})',
-            r'youtube\.com/v/([a-zA-Z0-9_-]{11})'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
-        
-        return None
+        return extract_video_id(url)
     
-    def merge_data_sources(self) -> None:
-        """Объединение данных из разных источников без дублей"""
-        self.console.print(f"[bold blue]{get_text(self.language, 'merging_sources')}[/bold blue]")
-        
-        unique_records = {}
+    def merge_data_sources(self, since: Optional[Dict[str, Any]] = None) -> Dict[str, list]:
+        """Объединение источников за один проход: фильтрация, дедупликация и выбор итоговых колонок"""
+        sources = [(source_type, data) for source_type, data in self.data_sources.values() if data]
+        if len(sources) > 1:
+            self.console.print(f"[bold blue]{get_text(self.language, 'merging_sources')}[/bold blue]")
+        
+        columns = {name: [] for name in ('timestamp', 'video_id', 'title', 'url', 'channel', 'source')}
+        # При дозагрузке записи старше границы снимка пропускаются, а записи из ее последней секунды
+        # уже есть в снимке — их ключи заранее считаются увиденными
+        high_water = since['high_water'] if since else None
+        dedup_index = DedupIndex(self.dedup_flush_size)
+        if since:
+            # Ключи границы сохранены в виде video_id_time, а ID видео всегда из 11 символов
+            dedup_index.add_batch([(key[12:], key[:11]) for key in since['keys']])
         duplicates_count = 0
-        total_items = sum(len(data) for data in self.data_sources.values() if data)
+        # У потоковых источников длина заранее неизвестна
+        total_items = sum(len(data) for _, data in sources) if all(isinstance(data, list) for _, data in sources) else None
         
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
             console=self.console
         ) as progress:
-            task = progress.add_task(get_text(self.language, 'deduplication'), total=total_items)
+            task = progress.add_task(get_text(self.language, 'processing_records'), total=total_items)
             
-            for source_type, data in self.data_sources.items():
-                if not data:
-                    continue
-                    
-                for item in data:
-                    # Игнорируем YouTube Music
-                    if item.get('header') == 'YouTube Music':
-                        progress.advance(task)
-                        continue
-                    
-                    # Игнорируем записи с music.youtube.com
-                    if 'titleUrl' in item and 'music.youtube.com' in item['titleUrl']:
-                        progress.advance(task)
-                        continue
-                    
-                    # Для My Activity берем только Watched записи
-                    if source_type == 'my_activity' and not item.get('title', '').startswith('Watched'):
-                        progress.advance(task)
-                        continue
-                        
-                    if 'titleUrl' in item and 'time' in item:
-                        video_id = self.extract_video_id(item['titleUrl'])
+            for (_, data), (source_type, batches) in zip(sources, self.projected_sources(sources, high_water)):
+                # В HTML-выгрузке время без Z — местное, с нераспознанным часовым поясом, а None — дата не распознана
+                local_times = 0
+                undated = 0
+                for records, scanned in batches:
+                    progress.advance(task, scanned)
+                    if isinstance(data, HtmlHistoryFile):
+                        dated = [record for record in records if record[0] is not None]
+                        undated += len(records) - len(dated)
+                        records = dated
+                        local_times += sum(1 for record in records if not record[0].endswith('Z'))
+                    fresh = dedup_index.add_batch([record[:2] for record in records])
+                    for (timestamp, video_id, title, url, channel), is_new in zip(records, fresh):
+                        if not is_new:
+                            duplicates_count += 1
+                            continue
                         
-                        if video_id:
-                            unique_key = f"{video_id}_{item['time']}"
-                            
-                            if unique_key not in unique_records:
-                                item_with_source = item.copy()
-                                item_with_source['_source'] = source_type
-                                unique_records[unique_key] = item_with_source
-                            else:
-                                duplicates_count += 1
-                    
-                    progress.advance(task)
-            
-            self.data = list(unique_records.values())
-            self.console.print(f"[green]✓ {get_text(self.language, 'merged_unique', count=len(self.data))}[/green]")
+                        columns['timestamp'].append(timestamp)
+                        columns['video_id'].append(video_id)
+                        columns['title'].append(title)
+                        columns['url'].append(url)
+                        columns['channel'].append(channel)
+                        columns['source'].append(source_type)
+                
+                if local_times:
+                    self.console.print(f"[yellow]⚠ {get_text(self.language, 'html_unknown_timezone', count=local_times, path=data.path)}[/yellow]")
+                if undated:
+                    self.console.print(f"[yellow]⚠ {get_text(self.language, 'html_unknown_date', count=undated, path=data.path)}[/yellow]")
+        
+        if len(sources) > 1:
+            self.console.print(f"[green]✓ {get_text(self.language, 'merged_unique', count=len(columns['video_id']))}[/green]")
             self.console.print(f"[yellow]{get_text(self.language, 'found_duplicates', count=duplicates_count)}[/yellow]")
+        
+        return columns
     
-    def process_data(self) -> None:
-        """Обработка данных истории"""
-        self.console.print(f"[bold blue]{get_text(self.language, 'processing_data')}[/bold blue]")
+    def projected_sources(self, sources: List[Tuple[str, Any]],
+                          high_water: Optional[str]) -> Iterator[Tuple[str, Iterable[Tuple[List[tuple], int]]]]:
+        """Отобранные записи каждого источника пачками, по порядку источников; большие файлы разбираются в пуле процессов"""
+        # Дозагрузка читает только начало файлов и останавливается на старых записях — пул ей не нужен
+        tasks = self.parallel_ingest_tasks(sources) if high_water is None else []
+        task_count = sum(len(source_tasks) for source_tasks in tasks)
+        if task_count == 0:
+            for source_type, data in sources:
+                yield source_type, project_records(data, source_type, high_water, self.incremental_stop_after)
+            return
         
-        if len([data for data in self.data_sources.values() if data]) > 1:
-            self.merge_data_sources()
-        else:
-            for source_type, data in self.data_sources.items():
-                if data:
-                    self.data = data
-                    break
+        self.console.print(get_text(self.language, 'parallel_ingest', tasks=task_count, workers=self.ingest_workers))
+        with ProcessPoolExecutor(max_workers=self.ingest_workers) as executor:
+            futures = [[executor.submit(func, *args) for func, args in source_tasks] for source_tasks in tasks]
+            # Результаты забираются в исходном порядке, поэтому дедупликация дает тот же итог, что и без пула
+            for (source_type, data), source_futures in zip(sources, futures):
+                if source_futures:
+                    yield source_type, (future.result() for future in source_futures)
+                else:
+                    yield source_type, project_records(data, source_type)
+    
+    def parallel_ingest_tasks(self, sources: List[Tuple[str, Any]]) -> List[List[Tuple[Callable, tuple]]]:
+        """Задачи для пула процессов по каждому источнику: диапазоны байтов больших JSON-файлов, архивы и HTML — целиком"""
+        if self.ingest_workers <= 1:
+            return []
+        
+        tasks = []
+        for source_type, data in sources:
+            if isinstance(data, JsonArrayFile) and split_archive_path(data.path)[1] is None:
+                tasks.append([(project_json_range, (data.path, source_type, start, end))
+                              for start, end in json_array_ranges(data.path, self.ingest_chunk_size)])
+            elif isinstance(data, (JsonArrayFile, HtmlHistoryFile)):
+                tasks.append([(project_source, (data, source_type))])
+            else:
+                tasks.append([])
         
-        processed_data = []
+        # Единственную задачу быстрее выполнить в текущем процессе, чем запускать пул
+        return tasks if sum(len(source_tasks) for source_tasks in tasks) > 1 else []
+    
+    def process_data(self, base: Optional[pd.DataFrame] = None, since: Optional[Dict[str, Any]] = None) -> None:
+        """Обработка данных истории (с base и since — только записи новее границы, добавляемые к base)"""
+        self.console.print(f"[bold blue]{get_text(self.language, 'processing_data')}[/bold blue]")
         
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            console=self.console
-        ) as progress:
-            task = progress.add_task(get_text(self.language, 'processing_records'), total=len(self.data))
+        columns = self.merge_data_sources(since)
+        self.history_boundary = ingest_boundary(columns['timestamp'], columns['video_id'], since)
+        self.df = pd.DataFrame(columns)
+        if len(self.df) > 0:
+            for name, values in time_columns(columns['timestamp']).items():
+                self.df[name] = values
             
-            for item in self.data:
-                # Игнорируем YouTube Music
-                if item.get('header') == 'YouTube Music':
-                    progress.advance(task)
-                    continue
-                
-                # Игнорируем записи с music.youtube.com
-                if 'titleUrl' in item and 'music.youtube.com' in item['titleUrl']:
-                    progress.advance(task)
-                    continue
-                
-                # Для My Activity берем только Watched записи
-                if item.get('_source') == 'my_activity' and not item.get('title', '').startswith('Watched'):
-                    progress.advance(task)
-                    continue
-                    
-                if 'titleUrl' in item and 'time' in item:
-                    video_id = self.extract_video_id(item['titleUrl'])
-                    
-                    if video_id:
-                        processed_item = {
-                            'timestamp': item['time'],
-                            'video_id': video_id,
-                            'title': item.get('title', 'Unknown'),
-                            'url': item['titleUrl'],
-                            'channel': item.get('subtitles', [{}])[0].get('name', 'Unknown') if item.get('subtitles') else 'Unknown',
-                            'source': item.get('_source', 'unknown')
-                        }
-                        processed_data.append(processed_item)
-                
-                progress.advance(task)
+            if self.compact_schema:
+                self.apply_compact_schema()
         
-        self.df = pd.DataFrame(processed_data)
-        if len(self.df) > 0:
-            self.df['timestamp'] = pd.to_datetime(self.df['timestamp'])
-            self.df['date'] = self.df['timestamp'].dt.date
-            self.df['hour'] = self.df['timestamp'].dt.hour
-            self.df['day_of_week'] = self.df['timestamp'].dt.day_name()
-            self.df['month'] = self.df['timestamp'].dt.month
-            self.df['year'] = self.df['timestamp'].dt.year
+        if base is not None:
+            self.console.print(f"[green]✓ {get_text(self.language, 'incremental_appended', count=len(self.df), existing=len(base))}[/green]")
+            self.df = append_history(base, self.df)
         
+        self.mark_data_changed()
         self.console.print(f"[green]✓ {get_text(self.language, 'processed_records', count=len(self.df))}[/green]")
     
-    def get_durations(self, sample_size: int = 100) -> None:
-        """Получение длительности видео для выборки"""
+    def mark_data_changed(self) -> None:
+        """Сброс сохраненных агрегатов после изменения данных"""
+        self.data_version += 1
+        self.aggregation_cache.clear()
+    
+    def aggregate(self, name: str, compute: Callable[[], Any]) -> Any:
+        """Агрегат, вычисленный один раз для текущей версии данных"""
+        cached = self.aggregation_cache.get(name)
+        if cached is None or cached[0] != self.data_version:
+            cached = (self.data_version, compute())
+            self.aggregation_cache[name] = cached
+        return cached[1]
+    
+    def apply_compact_schema(self) -> None:
+        """Перевод DataFrame в компактную колоночную схему с отчетом об экономии памяти"""
+        before = self.df.memory_usage(deep=True)
+        
+        # Ссылка восстанавливается по video_id, поэтому колонку не храним
+        df = self.df.drop(columns=['url'], errors='ignore')
+        df['channel'] = df['channel'].astype('category')
+        df['source'] = df['source'].astype('category')
+        df['day_of_week'] = df['day_of_week'].astype(pd.CategoricalDtype(DAY_NAMES, ordered=True))
+        df['hour'] = df['hour'].astype('int8')
+        df['month'] = df['month'].astype('int8')
+        df['year'] = df['year'].astype('int16')
+        
+        date = df['timestamp'].dt.normalize()
+        if date.dt.tz is not None:
+            date = date.dt.tz_localize(None)
+        df['date'] = date
+        
+        self.df = df
+        self.show_memory_usage(before, df.memory_usage(deep=True))
+    
+    def show_memory_usage(self, before: pd.Series, after: pd.Series) -> None:
+        """Таблица потребления памяти по колонкам до и после смены схемы"""
+        table = Table(title=get_text(self.language, 'memory_usage_title'))
+        table.add_column(get_text(self.language, 'memory_column'), style="cyan")
+        table.add_column(get_text(self.language, 'memory_before'), style="yellow", justify="right")
+        table.add_column(get_text(self.language, 'memory_after'), style="green", justify="right")
+        
+        for column in before.index:
+            after_value = f"{after[column] / 1024 / 1024:.1f} MB" if column in after.index else "—"
+            table.add_row(str(column), f"{before[column] / 1024 / 1024:.1f} MB", after_value)
+        
+        table.add_row(get_text(self.language, 'memory_total'), f"{before.sum() / 1024 / 1024:.1f} MB", f"{after.sum() / 1024 / 1024:.1f} MB")
+        self.console.print(table)
+    
+    def get_durations(self, sample_size: Optional[int] = 100, strata: Optional[str] = None) -> None:
+        """Получение длительности видео для выборки (None — для всех уникальных видео истории)"""
         if self.df is None or len(self.df) == 0:
             self.console.print(f"[red]{get_text(self.language, 'no_data_loaded')}[/red]")
             return
         
-        self.console.print(f"[bold blue]{get_text(self.language, 'getting_durations', count=sample_size)}[/bold blue]")
+        # Незавершенное задание из прошлого запуска (квота закончилась, Ctrl-C)
+        job = DurationJob.load(self.duration_job_path)
+        if job is not None and job.pending_count:
+            if Confirm.ask(get_text(self.language, 'job_resume_prompt', pending=job.pending_count, resolved=job.processed_count)):
+                self.resume_duration_job(job)
+                return
+            job.delete()
         
         # Фильтруем видео с доступными каналами (не Unknown)
-        available_videos = self.df[self.df['channel'] != 'Unknown'].copy()
+        available_videos = self.df[self.df['channel'] != 'Unknown']
         
         if len(available_videos) == 0:
             self.console.print(f"[red]{get_text(self.language, 'no_available_videos')}[/red]")
             return
         
-        # Берем случайную выборку из доступных видео
-        sample_size = min(sample_size, len(available_videos))
-        sample = available_videos.sample(sample_size)
+        # Стратифицированная оценка имеет смысл только для случайной выборки
+        self.sampling_strata = strata if sample_size is not None else None
+        
+        if sample_size is None:
+            # Полное покрытие: каждое видео один раз, самые просматриваемые — первыми
+            sample = self.select_videos_by_frequency(available_videos)
+            self.console.print(f"[bold blue]{get_text(self.language, 'getting_durations_all', count=len(sample))}[/bold blue]")
+        elif strata is not None:
+            self.console.print(f"[bold blue]{get_text(self.language, 'getting_durations', count=sample_size)}[/bold blue]")
+            sample = self.draw_stratified_sample(available_videos, sample_size, strata)
+        else:
+            self.console.print(f"[bold blue]{get_text(self.language, 'getting_durations', count=sample_size)}[/bold blue]")
+            # Берем случайную выборку из доступных видео
+            sample_size = min(sample_size, len(available_videos))
+            sample = available_videos.sample(sample_size)
         
         self.console.print(f"[blue]{get_text(self.language, 'selected_videos', count=len(sample))}[/blue]")
         self.console.print(f"[blue]{get_text(self.language, 'total_available', count=len(available_videos))}[/blue]")
         
-        # Получаем длительность через API
-        self.get_durations_api(sample)
+        # Сначала берем то, что уже известно из прошлых запусков
+        sample = sample[~sample['video_id'].isin(self.video_durations)]
+        self.duration_cache.reset_counters()
+        cached, unavailable = self.duration_cache.lookup(sample['video_id'].unique())
+        self.add_known_durations(cached)
+        to_fetch = sample[~sample['video_id'].isin(cached) & ~sample['video_id'].isin(unavailable)]
+        
+        job = DurationJob(self.duration_job_path, 'api', to_fetch['video_id'].unique()) if len(to_fetch) > 0 else None
+        self.run_duration_job(to_fetch, job)
+    
+    def select_videos_by_frequency(self, videos: pd.DataFrame) -> pd.DataFrame:
+        """Уникальные видео, упорядоченные по числу просмотров (по убыванию)"""
+        watch_counts = videos['video_id'].value_counts(sort=False)
+        unique_videos = videos.drop_duplicates('video_id')
+        # Устойчивая сортировка: при равном числе просмотров сохраняется порядок истории
+        order = (-unique_videos['video_id'].map(watch_counts).to_numpy()).argsort(kind='stable')
+        return unique_videos.iloc[order]
+    
+    def stratum_labels(self, df: pd.DataFrame, strata: Optional[str]) -> pd.Series:
+        """Метка страты для каждого просмотра: канал (топ каналов и «прочие»), год или часовой интервал"""
+        if strata == 'channel':
+            # Топ считаем по всей истории, чтобы метки совпадали при выборке и при оценке
+            top_channels = self.df['channel'].astype(str).value_counts().index[:self.strata_top_channels]
+            channels = df['channel'].astype(str)
+            return channels.where(channels.isin(top_channels), get_text(self.language, 'stratum_other'))
+        if strata == 'year':
+            return df['year'].astype(int).astype(str)
+        if strata == 'hour':
+            buckets = {start: f"{start:02d}-{start + HOUR_BUCKET_SIZE - 1:02d}" for start in range(0, 24, HOUR_BUCKET_SIZE)}
+            return (df['hour'].astype(int) // HOUR_BUCKET_SIZE * HOUR_BUCKET_SIZE).map(buckets)
+        return pd.Series('all', index=df.index)
+    
+    def draw_stratified_sample(self, videos: pd.DataFrame, sample_size: int, strata: str) -> pd.DataFrame:
+        """Стратифицированная выборка просмотров: бюджет делится между стратами так, чтобы минимизировать дисперсию оценки"""
+        # Длительности из прошлых запусков служат пилотной выборкой для оценки разброса в стратах
+        cached, _ = self.duration_cache.lookup(videos['video_id'].unique())
+        self.add_known_durations(cached)
+        
+        labels = self.stratum_labels(videos, strata)
+        stats = self.stratum_duration_stats(videos, labels)
+        # Пока длительностей нет совсем, считаем разброс одинаковым — распределение становится пропорциональным
+        stds = stats['std'] if (stats['std'] > 0).any() else pd.Series(1.0, index=stats.index)
+        
+        # Единица выборки — уникальное видео, а не просмотр: иначе часть бюджета уходит на повторы ID.
+        # Видео из нескольких страт относится к той, где его смотрели чаще всего
+        unknown = ~videos['video_id'].isin(self.video_durations)
+        frame = pd.DataFrame({'stratum': labels[unknown], 'video_id': videos.loc[unknown, 'video_id'].astype(str)})
+        frame = frame.groupby(['stratum', 'video_id'], sort=False).size().rename('watches').reset_index()
+        frame = frame.sort_values('watches', ascending=False, kind='stable').drop_duplicates('video_id')
+        capacity = frame.groupby('stratum').size().reindex(stats.index, fill_value=0)
+        
+        allocation = allocate_sample(stats['unknown'].to_dict(), stds.to_dict(), stats['videos'].to_dict(),
+                                     capacity.to_dict(), sample_size)
+        
+        # Вероятность попасть в выборку пропорциональна числу просмотров, как и при выборе случайного просмотра
+        parts = [group.sample(allocation[label], weights='watches') for label, group in frame.groupby('stratum') if allocation[label] > 0]
+        self.show_strata_allocation(stats, allocation)
+        chosen = pd.concat(parts)['video_id'] if parts else []
+        unique_videos = videos.drop_duplicates('video_id')
+        return unique_videos[unique_videos['video_id'].astype(str).isin(chosen)]
+    
+    def stratum_duration_stats(self, df: pd.DataFrame, labels: pd.Series) -> pd.DataFrame:
+        """Сводка по стратам: просмотры, неизвестные просмотры и разброс длительностей уникальных известных видео"""
+        durations = df['video_id'].map(self.video_durations)
+        known = durations.notna()
+        stats = pd.DataFrame({
+            'watches': labels.groupby(labels).size(),
+            'unknown': (~known).groupby(labels).sum(),
+            'known_total': durations.groupby(labels).sum()
+        })
+        
+        # Просмотры выбираются равновероятно, поэтому видео попадает в выборку пропорционально числу просмотров,
+        # и среднее по уникальным видео оценивает среднюю длительность просмотра. Видео, которое смотрели
+        # в нескольких стратах, делится между ними по доле своих просмотров и не завышает объем выборки
+        pairs = pd.DataFrame({'stratum': labels[known], 'video_id': df['video_id'][known], 'duration': durations[known]})
+        pairs = pairs.groupby(['stratum', 'video_id'], sort=False).agg(watches=('duration', 'size'), duration=('duration', 'first')).reset_index()
+        pairs['weight'] = pairs['watches'] / pairs.groupby('video_id')['watches'].transform('sum')
+        pairs['weighted'] = pairs['weight'] * pairs['duration']
+        weights = pairs.groupby('stratum')['weight'].sum()
+        means = pairs.groupby('stratum')['weighted'].sum() / weights
+        pairs['deviation'] = pairs['weight'] * (pairs['duration'] - pairs['stratum'].map(means)) ** 2
+        stds = (pairs.groupby('stratum')['deviation'].sum() / (weights - 1).where(weights > 1)) ** 0.5
+        stats['videos'] = weights.reindex(stats.index, fill_value=0.0)
+        
+        # В стратах без данных (или с одним видео) используем общие среднее и разброс
+        pooled = pairs.drop_duplicates('video_id')['duration']
+        pooled_mean = pooled.mean() if len(pooled) > 0 else 0.0
+        pooled_std = pooled.std() if len(pooled) >= 2 else 0.0
+        stats['mean'] = means.reindex(stats.index).fillna(pooled_mean)
+        stats['std'] = stds.reindex(stats.index).where(stats['videos'] >= 2, pooled_std).fillna(pooled_std)
+        return stats
+    
+    def show_strata_allocation(self, stats: pd.DataFrame, allocation: Dict[Any, int]) -> None:
+        """Таблица распределения выборки по стратам"""
+        table = Table(title=get_text(self.language, 'strata_allocation_title'))
+        table.add_column(get_text(self.language, 'stratum'), style="cyan")
+        table.add_column(get_text(self.language, 'stratum_watches'), justify="right")
+        table.add_column(get_text(self.language, 'stratum_known'), justify="right")
+        table.add_column(get_text(self.language, 'stratum_allocated'), style="green", justify="right")
+        
+        for label, row in stats.sort_values('watches', ascending=False).iterrows():
+            table.add_row(str(label), f"{int(row['watches']):,}", f"{row['videos']:,.0f}", f"{allocation[label]:,}")
+        self.console.print(table)
+    
+    def estimate_total_watch_time(self) -> Tuple[float, float]:
+        """Стратифицированная оценка общего времени просмотра и ее стандартная ошибка"""
+        labels = self.stratum_labels(self.df, self.sampling_strata)
+        stats = self.stratum_duration_stats(self.df, labels)
+        
+        # Известные просмотры учитываются точно, оценивается только остаток каждой страты
+        total = float((stats['known_total'] + stats['unknown'] * stats['mean']).sum())
+        # Поправка на конечную совокупность: полностью известная страта не дает ошибки
+        finite_correction = stats['unknown'] / stats['watches']
+        variance = float((stats['unknown'] ** 2 * stats['std'] ** 2 / stats['videos'].clip(lower=1) * finite_correction).sum())
+        return total, math.sqrt(variance)
+    
+    def resume_duration_job(self, job: DurationJob) -> None:
+        """Продолжение сохраненного задания с того места, где оно остановилось"""
+        self.console.print(f"[blue]{get_text(self.language, 'job_resumed', pending=job.pending_count, resolved=job.processed_count)}[/blue]")
+        
+        # Результаты задания лежат в кэше: и полученные ранее, и полученные после последней контрольной точки
+        self.duration_cache.reset_counters()
+        cached, unavailable = self.duration_cache.lookup(job.queue)
+        self.add_known_durations(cached)
+        for video_id in [*cached, *unavailable]:
+            job.complete(video_id)
+        
+        # Видео, которых нет в загруженной истории, получить не для чего — убираем их из очереди
+        rows = self.df.drop_duplicates('video_id').set_index('video_id')
+        pending = job.pending_ids()
+        missing = [video_id for video_id in pending if video_id not in rows.index]
+        if missing:
+            self.console.print(f"[yellow]{get_text(self.language, 'job_missing_videos', count=len(missing))}[/yellow]")
+            for video_id in missing:
+                job.complete(video_id)
+        
+        to_fetch = rows.loc[[video_id for video_id in pending if video_id in rows.index]].reset_index()
+        self.run_duration_job(to_fetch, job)
+    
+    def run_duration_job(self, to_fetch: pd.DataFrame, job: Optional[DurationJob]) -> None:
+        """Запуск получения длительностей для видео, которых нет в кэше"""
+        # Без ключа API ничего не будет получено — новое задание не сохраняем, иначе следующий запуск предложит его продолжить
+        api_key = self.read_api_key() if len(to_fetch) > 0 else None
+        if len(to_fetch) > 0 and api_key is None:
+            return
+        
+        try:
+            if len(to_fetch) > 0:
+                job.save()
+                # Получаем длительность через API
+                self.get_durations_api(to_fetch, job, api_key)
+            elif self.video_durations:
+                self.show_duration_statistics()
+        finally:
+            # Сохраняем очередь и при штатном завершении, и при 403 или Ctrl-C
+            self.checkpoint_duration_job(job, force=True)
+            self.duration_cache.flush()
+            if job is not None and job.pending_count:
+                self.console.print(f"\n[yellow]{get_text(self.language, 'job_saved', count=job.pending_count, path=job.path)}[/yellow]")
+        
+        self.console.print(f"[blue]{get_text(self.language, 'duration_cache_summary', hits=self.duration_cache.hits, unavailable=self.duration_cache.negative_hits, misses=self.duration_cache.misses)}[/blue]")
+    
+    def checkpoint_duration_job(self, job: Optional[DurationJob], force: bool = False) -> None:
+        """Сохранение контрольной точки задания вместе с кэшем длительностей"""
+        if job is None or (not force and time.monotonic() - job.saved_at < self.checkpoint_interval):
+            return
+        self.duration_cache.flush()
+        if job.pending_count:
+            job.save()
+        else:
+            job.delete()
+    
+    def create_fetch_scheduler(self, backend: str) -> FetchScheduler:
+        """Планировщик запросов с настройками параллельности и частоты для бэкенда"""
+        scheduler = FetchScheduler(self.fetch_workers[backend], self.fetch_rate_limits[backend])
+        self.fetch_stop = scheduler.stopped
+        return scheduler
+    
+    def add_known_durations(self, durations: Dict[str, int]) -> None:
+        """Добавление длительностей в память с обновлением накопительной статистики"""
+        added = False
+        for video_id, duration in durations.items():
+            if video_id not in self.video_durations:
+                self.duration_stats.add(duration)
+                self.video_durations[video_id] = duration
+                added = True
+        if added:
+            self.mark_data_changed()
+    
+    def remember_duration(self, video_id: str, duration: int) -> None:
+        """Запоминание длительности в памяти и в постоянном кэше"""
+        self.add_known_durations({video_id: duration})
+        self.duration_cache.store(video_id, duration)
+    
+    def remember_unavailable(self, video_id: str) -> None:
+        """Отметка о недоступном видео, чтобы не запрашивать его повторно до истечения TTL"""
+        self.duration_cache.store(video_id, None)
     
     def get_durations_ytdlp(self, sample_df) -> None:
         """Получение длительности через yt-dlp"""
@@ -307,9 +1721,22 @@ class YouTubeAnalyzer:
             ydl_opts['sleep_interval'] = 1
             ydl_opts['max_sleep_interval'] = 3
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                processed = 0
+            # У каждого потока свой экземпляр YoutubeDL: он не рассчитан на общий доступ из потоков
+            local = threading.local()
+            instances = []
+            
+            def extract_info(video_url):
+                ydl = getattr(local, 'ydl', None)
+                if ydl is None:
+                    ydl = yt_dlp.YoutubeDL(ydl_opts)
+                    local.ydl = ydl
+                    instances.append(ydl)
+                return ydl.extract_info(video_url, download=False)
+            
+            try:
                 total = len(sample_df)
+                rows = [(row['video_id'], row['title'], row.get('url') or make_video_url(row['video_id']))
+                        for _, row in sample_df.iterrows()]
                 
                 with Progress(
                     SpinnerColumn(),
@@ -317,42 +1744,32 @@ class YouTubeAnalyzer:
                     console=self.console
                 ) as progress:
                     task = progress.add_task(get_text(self.language, 'getting_duration'), total=total)
+                    scheduler = self.create_fetch_scheduler('ytdlp')
                     
-                    for _, row in sample_df.iterrows():
-                        video_id = row['video_id']
-                        video_url = row['url']
-                        
+                    for (video_id, title, video_url), future in scheduler.map(lambda row: extract_info(row[2]), rows):
                         try:
-                            # Получаем информацию о видео
-                            self.console.print(f"\n[blue]{get_text(self.language, 'getting_info_for', title=row['title'][:50])}[/blue]")
+                            # Информация о видео уже получена в рабочем потоке
+                            self.console.print(f"\n[blue]{get_text(self.language, 'getting_info_for', title=title[:50])}[/blue]")
                             self.console.print(f"[blue]URL: {video_url}[/blue]")
                             
-                            # Получаем информацию в extract_flat режиме
-                            info = ydl.extract_info(video_url, download=False)
+                            info = future.result()
                             
                             if info and 'duration' in info:
                                 duration = info['duration']
-                                self.video_durations[video_id] = duration
+                                self.remember_duration(video_id, duration)
                                 
                                 # Показываем прогресс
                                 minutes = duration // 60
                                 seconds = duration % 60
-                                progress.update(task, description=f"✓ {row['title'][:30]}... ({minutes}:{seconds:02d})")
+                                progress.update(task, description=f"✓ {title[:30]}... ({minutes}:{seconds:02d})")
                             else:
-                                progress.update(task, description=get_text(self.language, 'duration_not_found', title=row['title'][:30]))
-                            
-                            processed += 1
+                                progress.update(task, description=get_text(self.language, 'duration_not_found', title=title[:30]))
                             
                         except Exception as e:
-                            progress.update(task, description=get_text(self.language, 'duration_error', title=row['title'][:30], error=str(e)[:20]))
+                            progress.update(task, description=get_text(self.language, 'duration_error', title=title[:30], error=str(e)[:20]))
                             self.console.print(f"[red]❌ {get_text(self.language, 'error')}: {str(e)}[/red]")
-                            processed += 1
                         
                         progress.advance(task)
-                        
-                        # Небольшая задержка чтобы не перегружать YouTube
-                        import time
-                        time.sleep(1)
                 
                 self.console.print(f"\n[green]{get_text(self.language, 'duration_obtained', obtained=len(self.video_durations), total=total)}[/green]")
                 
@@ -371,6 +1788,9 @@ class YouTubeAnalyzer:
                 self.console.print(f"[yellow]{get_text(self.language, 'wrong_cookies')}[/yellow]")
                 self.console.print(f"[yellow]{get_text(self.language, 'videos_unavailable')}[/yellow]")
                 self.show_cookies_instructions()
+            finally:
+                for ydl in instances:
+                    ydl.close()
             
         except ImportError:
             self.console.print(f"[red]{get_text(self.language, 'yt_dlp_not_installed')}[/red]")
@@ -435,7 +1855,25 @@ class YouTubeAnalyzer:
             self.console.print(f"[red]{get_text(self.language, 'iso_parse_error', error=e)}[/red]")
             return 0
     
-    def get_durations_api(self, sample_df) -> None:
+    def read_api_key(self) -> Optional[str]:
+        """Ключ YouTube Data API из youtube_api_key.txt (None с подсказкой, если файла нет или он пустой)"""
+        api_key_file = Path("youtube_api_key.txt")
+        if not api_key_file.exists():
+            self.console.print(f"[red]{get_text(self.language, 'api_key_not_found')}[/red]")
+            self.console.print(f"[yellow]{get_text(self.language, 'api_key_instructions')}[/yellow]")
+            self.show_api_instructions()
+            return None
+        
+        with open(api_key_file, 'r') as f:
+            api_key = f.read().strip()
+        
+        if not api_key:
+            self.console.print(f"[red]{get_text(self.language, 'api_key_empty')}[/red]")
+            self.show_api_instructions()
+            return None
+        return api_key
+    
+    def get_durations_api(self, sample_df, job: Optional[DurationJob] = None, api_key: Optional[str] = None) -> None:
         """Получение длительности через YouTube Data API v3"""
         try:
             import requests
@@ -443,26 +1881,22 @@ class YouTubeAnalyzer:
             import time
             
             # Проверяем наличие API ключа
-            api_key_file = Path("youtube_api_key.txt")
-            if not api_key_file.exists():
-                self.console.print(f"[red]{get_text(self.language, 'api_key_not_found')}[/red]")
-                self.console.print(f"[yellow]{get_text(self.language, 'api_key_instructions')}[/yellow]")
-                self.show_api_instructions()
-                return
-            
-            with open(api_key_file, 'r') as f:
-                api_key = f.read().strip()
-            
-            if not api_key:
-                self.console.print(f"[red]{get_text(self.language, 'api_key_empty')}[/red]")
-                self.show_api_instructions()
-                return
+            if api_key is None:
+                api_key = self.read_api_key()
+                if api_key is None:
+                    return
             
             self.console.print(f"[green]✓ {get_text(self.language, 'using_api')}[/green]")
-            self.console.print(f"[blue]📋 {get_text(self.language, 'total_videos', count=len(sample_df))}[/blue]")
             
-            processed = 0
-            total = len(sample_df)
+            # Счетчики повторов и соединений считаем за текущий запуск
+            self.http_stats = {'requests': 0, 'retries': 0}
+            pool_requests_before, pool_connections_before = self.http_pool_counters()
+            
+            # Один запрос на пачку ID: квота та же (1 единица), запросов в 50 раз меньше
+            titles = sample_df.drop_duplicates('video_id').set_index('video_id')['title'].to_dict()
+            video_ids = list(titles)
+            total = len(video_ids)
+            self.console.print(f"[blue]📋 {get_text(self.language, 'total_videos', count=total)}[/blue]")
             
             with Progress(
                 SpinnerColumn(),
@@ -471,59 +1905,46 @@ class YouTubeAnalyzer:
             ) as progress:
                 task = progress.add_task(get_text(self.language, 'getting_durations', count=total), total=total)
                 
-                for _, row in sample_df.iterrows():
-                    video_id = row['video_id']
+                batches = [video_ids[start:start + API_BATCH_SIZE] for start in range(0, total, API_BATCH_SIZE)]
+                scheduler = self.create_fetch_scheduler('api')
+                
+                for batch, future in scheduler.map(lambda batch: self.fetch_api_durations(api_key, batch), batches):
+                    batch_title = titles[batch[0]][:30]
                     
                     try:
-                        # Формируем URL для API запроса
-                        api_url = f"https://www.googleapis.com/youtube/v3/videos"
-                        params = {
-                            'id': video_id,
-                            'key': api_key,
-                            'part': 'contentDetails,statistics'
-                        }
+                        status_code, durations = future.result()
                         
-                        response = requests.get(api_url, params=params, timeout=10)
-                        
-                        if response.status_code == 200:
-                            data = response.json()
-                            
-                            if data.get('items') and len(data['items']) > 0:
-                                video_info = data['items'][0]
-                                content_details = video_info.get('contentDetails', {})
+                        if status_code == 200:
+                            for video_id in batch:
+                                title = titles[video_id]
                                 
-                                # Получаем длительность в формате ISO 8601 (PT3M7S)
-                                duration_str = content_details.get('duration', '')
-                                
-                                if duration_str:
-                                    duration_seconds = self.parse_iso_duration(duration_str)
+                                # ID, которых нет в ответе, — удаленные или приватные видео
+                                if video_id not in durations:
+                                    self.remember_unavailable(video_id)
+                                    progress.update(task, description=get_text(self.language, 'video_unavailable', title=title[:30]))
+                                elif not durations[video_id]:
+                                    self.remember_unavailable(video_id)
+                                    progress.update(task, description=get_text(self.language, 'duration_not_found', title=title[:30]))
+                                else:
+                                    duration_seconds = self.parse_iso_duration(durations[video_id])
                                     
                                     if duration_seconds > 0:
-                                        self.video_durations[video_id] = duration_seconds
+                                        self.remember_duration(video_id, duration_seconds)
                                         minutes = duration_seconds // 60
                                         seconds = duration_seconds % 60
                                         
-                                        # Вычисляем текущее среднее значение
-                                        current_avg = sum(self.video_durations.values()) / len(self.video_durations)
+                                        # Текущее среднее берем из накопительной статистики
+                                        current_avg = self.duration_stats.mean
                                         avg_minutes = int(current_avg // 60)
                                         avg_seconds = int(current_avg % 60)
                                         
                                         progress.update(task, description=get_text(self.language, 'duration_progress', 
-                                                                               title=row['title'][:30], 
+                                                                               title=title[:30], 
                                                                                duration=f"{minutes}:{seconds:02d}", 
                                                                                avg_duration=f"{avg_minutes}:{avg_seconds:02d}"))
                                         
                                         # Сохраняем данные о среднем для графика сходимости (для каждого видео)
-                                        self.average_progression.append((len(self.video_durations), current_avg))
-                                        self.average_data.append({
-                                            'video_count': len(self.video_durations),
-                                            'average_duration_seconds': current_avg,
-                                            'average_duration_minutes': round(current_avg / 60, 1),
-                                            'average_duration_formatted': f"{avg_minutes}:{avg_seconds:02d}",
-                                            'total_duration_seconds': sum(self.video_durations.values()),
-                                            'current_video_duration': duration_seconds,
-                                            'current_video_title': row['title'][:50]
-                                        })
+                                        self.average_progression.append((self.duration_stats.count, current_avg, self.duration_stats.total, duration_seconds, title[:50]))
                                         
                                         # Показываем изменение среднего значения каждые 5 видео
                                         if len(self.video_durations) % 5 == 0:
@@ -536,44 +1957,48 @@ class YouTubeAnalyzer:
                                             progress_percent = (total_processed / total) * 100
                                             self.console.print(f"[green]✅ {get_text(self.language, 'processed_count', processed=total_processed, total=total, percent=progress_percent, remaining=total_remaining)}[/green]")
                                     else:
-                                        progress.update(task, description=get_text(self.language, 'parsing_error', title=row['title'][:30]))
-                                else:
-                                    progress.update(task, description=get_text(self.language, 'duration_not_found', title=row['title'][:30]))
-                            else:
-                                progress.update(task, description=get_text(self.language, 'video_unavailable', title=row['title'][:30]))
+                                        # Нулевая длительность у трансляций и премьер
+                                        self.remember_unavailable(video_id)
+                                        progress.update(task, description=get_text(self.language, 'parsing_error', title=title[:30]))
+                                
+                                if job is not None:
+                                    job.complete(video_id)
+                                progress.advance(task)
                         else:
-                            error_msg = f"HTTP {response.status_code}"
-                            if response.status_code == 403:
+                            error_msg = f"HTTP {status_code}"
+                            if status_code == 403:
                                 error_msg = get_text(self.language, 'api_key_invalid')
-                            elif response.status_code == 400:
+                            elif status_code == 400:
                                 error_msg = get_text(self.language, 'api_request_invalid')
                             
-                            progress.update(task, description=f"❌ {row['title'][:30]}... ({error_msg})")
+                            progress.update(task, description=f"❌ {batch_title}... ({error_msg})")
+                            progress.advance(task, len(batch))
                             
-                            if response.status_code == 403:
+                            if status_code == 403:
                                 self.console.print(f"[red]❌ {get_text(self.language, 'api_error')}: {error_msg}[/red]")
                                 self.console.print(f"[yellow]{get_text(self.language, 'api_check_key')}[/yellow]")
                                 break
                         
-                        processed += 1
-                        
                     except requests.exceptions.Timeout:
-                        progress.update(task, description=f"❌ {row['title'][:30]}... ({get_text(self.language, 'timeout')})")
-                        processed += 1
+                        progress.update(task, description=f"❌ {batch_title}... ({get_text(self.language, 'timeout')})")
+                        progress.advance(task, len(batch))
                     except requests.exceptions.RequestException as e:
-                        progress.update(task, description=f"❌ {row['title'][:30]}... ({get_text(self.language, 'network_error')})")
-                        processed += 1
+                        progress.update(task, description=f"❌ {batch_title}... ({get_text(self.language, 'network_error')})")
+                        progress.advance(task, len(batch))
                     except Exception as e:
-                        progress.update(task, description=f"❌ {row['title'][:30]}... ({get_text(self.language, 'error')}: {str(e)[:20]})")
-                        processed += 1
-                    
-                    progress.advance(task)
+                        progress.update(task, description=f"❌ {batch_title}... ({get_text(self.language, 'error')}: {str(e)[:20]})")
+                        progress.advance(task, len(batch))
                     
-                    # Небольшая задержка между запросами (API позволяет до 10,000 запросов в день)
-                    time.sleep(0.1)
+                    # Контрольная точка: при обрыве продолжим с этого места
+                    self.checkpoint_duration_job(job)
                 
                 self.console.print(f"\n[green]✓ {get_text(self.language, 'duration_complete', processed=len(self.video_durations), total=total)}[/green]")
                 
+                pool_requests, pool_connections = self.http_pool_counters()
+                pool_requests -= pool_requests_before
+                pool_connections -= pool_connections_before
+                self.console.print(f"[blue]{get_text(self.language, 'http_stats', requests=self.http_stats['requests'], retries=self.http_stats['retries'], connections=pool_connections, reused=max(0, pool_requests - pool_connections))}[/blue]")
+                
                 if self.video_durations:
                     self.show_duration_statistics()
                 else:
@@ -588,6 +2013,85 @@ class YouTubeAnalyzer:
             self.console.print(f"[red]{get_text(self.language, 'api_module_error', error=e)}[/red]")
             self.console.print(f"[yellow]{get_text(self.language, 'api_install_requests')}[/yellow]")
     
+    def get_http_session(self) -> requests.Session:
+        """HTTP-сессия с keep-alive: соединения переиспользуются между запросами и потоками"""
+        if self.http_session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(self.fetch_workers.values()))
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self.http_session = session
+        return self.http_session
+    
+    def http_pool_counters(self) -> Tuple[int, int]:
+        """Счетчики пулов urllib3: (выполнено запросов, открыто соединений)"""
+        requests_count = connections_count = 0
+        if self.http_session is None:
+            return 0, 0
+        # Один адаптер смонтирован и для http, и для https — считаем его один раз
+        adapters = {id(adapter): adapter for adapter in self.http_session.adapters.values()}
+        for adapter in adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                requests_count += pool.num_requests
+                connections_count += pool.num_connections
+        return requests_count, connections_count
+    
+    def backoff_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Задержка перед повтором: Retry-After, если сервер его прислал, иначе экспонента с джиттером"""
+        delay = retry_after_seconds(retry_after)
+        if delay is not None:
+            return min(delay, self.http_backoff_cap)
+        return random.uniform(0, min(self.http_backoff_cap, self.http_backoff_base * 2 ** attempt))
+    
+    def http_get_with_retry(self, url: str, params: Dict[str, Any], timeout: float = 10) -> requests.Response:
+        """GET через общую сессию с повторами на 429/5xx, таймаутах и обрывах соединения"""
+        session = self.get_http_session()
+        
+        for attempt in range(self.http_max_retries + 1):
+            last_attempt = attempt == self.http_max_retries
+            with self.http_stats_lock:
+                self.http_stats['requests'] += 1
+            
+            response = None
+            try:
+                response = session.get(url, params=params, timeout=timeout)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as error:
+                if last_attempt:
+                    raise
+                failure = error
+                delay = self.backoff_delay(attempt)
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                    return response
+                delay = self.backoff_delay(attempt, response.headers.get('Retry-After'))
+            
+            with self.http_stats_lock:
+                self.http_stats['retries'] += 1
+            # Пауза прерывается остановкой планировщика: результат уже никто не прочитает
+            if self.fetch_stop.wait(delay):
+                if response is None:
+                    raise failure
+                return response
+    
+    def fetch_api_durations(self, api_key: str, video_ids: List[str]) -> Tuple[int, Dict[str, str]]:
+        """Запрос videos.list для пачки ID: HTTP-статус и длительности ISO 8601 по ID видео"""
+        params = {
+            'id': ','.join(video_ids),
+            'key': api_key,
+            'part': 'contentDetails'
+        }
+        response = self.http_get_with_retry(API_VIDEOS_URL, params)
+        
+        if response.status_code != 200:
+            return response.status_code, {}
+        
+        durations = {}
+        for item in response.json().get('items', []):
+            durations[item['id']] = item.get('contentDetails', {}).get('duration', '')
+        return response.status_code, durations
+    
     def extract_duration_from_html(self, html_content: str) -> int:
         """Извлечение длительности из HTML страницы YouTube"""
         try:
@@ -680,85 +2184,96 @@ class YouTubeAnalyzer:
             
             try:
                 # Автоматическая установка драйвера
-                service = Service(ChromeDriverManager().install())
-                driver = webdriver.Chrome(service=service, options=chrome_options)
+                driver_path = ChromeDriverManager().install()
                 
-                # Загружаем cookies если есть
-                if cookies_file.exists():
-                    driver.get("https://www.youtube.com")
-                    with open(cookies_file, 'r') as f:
-                        for line in f:
-                            if line.startswith('#') or not line.strip():
-                                continue
-                            try:
-                                parts = line.strip().split('\t')
-                                if len(parts) >= 7:
-                                    cookie = {
-                                        'name': parts[5],
-                                        'value': parts[6],
-                                        'domain': parts[0],
-                                        'path': parts[2]
-                                    }
-                                    driver.add_cookie(cookie)
-                            except:
-                                continue
-                    self.console.print(f"[green]{get_text(self.language, 'cookies_loaded')}[/green]")
+                # У каждого потока свой браузер: WebDriver не рассчитан на общий доступ из потоков
+                local = threading.local()
+                drivers = []
                 
-                processed = 0
-                total = len(sample_df)
+                def get_driver():
+                    driver = getattr(local, 'driver', None)
+                    if driver is not None:
+                        return driver
+                    
+                    driver = webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+                    local.driver = driver
+                    drivers.append(driver)
+                    
+                    # Загружаем cookies если есть
+                    if cookies_file.exists():
+                        driver.get("https://www.youtube.com")
+                        with open(cookies_file, 'r') as f:
+                            for line in f:
+                                if line.startswith('#') or not line.strip():
+                                    continue
+                                try:
+                                    parts = line.strip().split('\t')
+                                    if len(parts) >= 7:
+                                        cookie = {
+                                            'name': parts[5],
+                                            'value': parts[6],
+                                            'domain': parts[0],
+                                            'path': parts[2]
+                                        }
+                                        driver.add_cookie(cookie)
+                                except:
+                                    continue
+                        self.console.print(f"[green]{get_text(self.language, 'cookies_loaded')}[/green]")
+                    return driver
                 
-                with Progress(
-                    SpinnerColumn(),
-                    TextColumn("[progress.description]{task.description}"),
-                    console=self.console
-                ) as progress:
-                    task = progress.add_task(get_text(self.language, 'getting_duration_browser'), total=total)
+                def read_duration_text(video_url):
+                    driver = get_driver()
+                    
+                    # Открываем страницу видео
+                    driver.get(video_url)
                     
-                    for _, row in sample_df.iterrows():
-                        video_url = row['url']
-                        video_id = row['video_id']
+                    # Ждем загрузки страницы
+                    WebDriverWait(driver, 10).until(
+                        EC.presence_of_element_located((By.TAG_NAME, "body"))
+                    )
+                    
+                    # Ищем элемент с длительностью
+                    try:
+                        duration_element = WebDriverWait(driver, 5).until(
+                            EC.presence_of_element_located((By.CSS_SELECTOR, "span.ytp-time-duration"))
+                        )
+                        return duration_element.text
+                    except:
+                        return None
+                
+                total = len(sample_df)
+                rows = [(row['video_id'], row['title'], row.get('url') or make_video_url(row['video_id']))
+                        for _, row in sample_df.iterrows()]
+                
+                try:
+                    with Progress(
+                        SpinnerColumn(),
+                        TextColumn("[progress.description]{task.description}"),
+                        console=self.console
+                    ) as progress:
+                        task = progress.add_task(get_text(self.language, 'getting_duration_browser'), total=total)
+                        scheduler = self.create_fetch_scheduler('selenium')
                         
-                        try:
-                            # Открываем страницу видео
-                            driver.get(video_url)
-                            
-                            # Ждем загрузки страницы
-                            WebDriverWait(driver, 10).until(
-                                EC.presence_of_element_located((By.TAG_NAME, "body"))
-                            )
-                            
-                            # Ищем элемент с длительностью
+                        for (video_id, title, video_url), future in scheduler.map(lambda row: read_duration_text(row[2]), rows):
                             try:
-                                duration_element = WebDriverWait(driver, 5).until(
-                                    EC.presence_of_element_located((By.CSS_SELECTOR, "span.ytp-time-duration"))
-                                )
-                                duration_text = duration_element.text
+                                duration_text = future.result()
                                 
                                 # Парсим длительность (формат: MM:SS или H:MM:SS)
-                                duration = self.parse_duration(duration_text)
+                                duration = self.parse_duration(duration_text) if duration_text else 0
                                 
                                 if duration > 0:
-                                    self.video_durations[video_id] = duration
-                                    progress.update(task, description=f"✓ {row['title'][:30]}... ({duration_text})")
+                                    self.remember_duration(video_id, duration)
+                                    progress.update(task, description=f"✓ {title[:30]}... ({duration_text})")
                                 else:
-                                    progress.update(task, description=get_text(self.language, 'duration_not_found', title=row['title'][:30]))
+                                    progress.update(task, description=get_text(self.language, 'duration_not_found', title=title[:30]))
                                 
-                            except:
-                                progress.update(task, description=get_text(self.language, 'duration_not_found', title=row['title'][:30]))
-                            
-                            processed += 1
+                            except Exception as e:
+                                progress.update(task, description=get_text(self.language, 'duration_error', title=title[:30], error=str(e)[:20]))
                             
-                        except Exception as e:
-                            progress.update(task, description=get_text(self.language, 'duration_error', title=row['title'][:30], error=str(e)[:20]))
-                            processed += 1
-                        
-                        progress.advance(task)
-                        
-                        # Задержка между запросами
-                        import time
-                        time.sleep(1)
-                
-                driver.quit()
+                            progress.advance(task)
+                finally:
+                    for driver in drivers:
+                        driver.quit()
                 
                 self.console.print(f"\n[green]{get_text(self.language, 'duration_obtained', obtained=len(self.video_durations), total=total)}[/green]")
                 
@@ -784,7 +2299,7 @@ class YouTubeAnalyzer:
         
         for i, (_, row) in enumerate(sample_df.head(total).iterrows()):
             self.console.print(f"\n[{i+1}/{total}] {row['title'][:50]}...")
-            self.console.print(f"URL: {row['url']}")
+            self.console.print(f"URL: {row.get('url') or make_video_url(row['video_id'])}")
             
             duration_input = input(get_text(self.language, 'manual_duration_input')).strip()
             
@@ -792,7 +2307,7 @@ class YouTubeAnalyzer:
                 try:
                     duration = self.parse_duration(duration_input)
                     if duration > 0:
-                        self.video_durations[row['video_id']] = duration
+                        self.remember_duration(row['video_id'], duration)
                         self.console.print(f"[green]{get_text(self.language, 'manual_duration_success', input=duration_input, duration=duration)}[/green]")
                         processed += 1
                     else:
@@ -833,8 +2348,10 @@ class YouTubeAnalyzer:
         self.console.print(f"\n[bold blue]{get_text(self.language, 'duration_stats_title')}[/bold blue]")
         
         durations = list(self.video_durations.values())
-        total_duration = sum(durations)
-        avg_duration = total_duration / len(durations)
+        stats = self.duration_stats
+        total_duration = stats.total
+        avg_duration = stats.mean
+        std_duration = int(stats.std)
         
         # Конвертируем в часы, минуты, секунды
         total_hours = total_duration // 3600
@@ -849,11 +2366,12 @@ class YouTubeAnalyzer:
         table.add_column(get_text(self.language, 'parameter'), style="cyan")
         table.add_column(get_text(self.language, 'value'), style="green")
         
-        table.add_row(get_text(self.language, 'total_videos_with_duration'), str(len(durations)))
+        table.add_row(get_text(self.language, 'total_videos_with_duration'), str(stats.count))
         table.add_row(get_text(self.language, 'total_watch_time'), get_text(self.language, 'time_format_hours', hours=total_hours, minutes=total_minutes, seconds=total_seconds))
         table.add_row(get_text(self.language, 'average_duration'), get_text(self.language, 'time_format_minutes', minutes=avg_minutes, seconds=avg_seconds))
-        table.add_row(get_text(self.language, 'shortest_video'), get_text(self.language, 'time_format_minutes', minutes=min(durations) // 60, seconds=min(durations) % 60))
-        table.add_row(get_text(self.language, 'longest_video'), get_text(self.language, 'time_format_minutes', minutes=max(durations) // 60, seconds=max(durations) % 60))
+        table.add_row(get_text(self.language, 'duration_std'), get_text(self.language, 'time_format_minutes', minutes=std_duration // 60, seconds=std_duration % 60))
+        table.add_row(get_text(self.language, 'shortest_video'), get_text(self.language, 'time_format_minutes', minutes=stats.minimum // 60, seconds=stats.minimum % 60))
+        table.add_row(get_text(self.language, 'longest_video'), get_text(self.language, 'time_format_minutes', minutes=stats.maximum // 60, seconds=stats.maximum % 60))
         
         self.console.print(table)
         
@@ -900,7 +2418,7 @@ class YouTubeAnalyzer:
             self.save_durations_to_csv()
         
         # Сохраняем данные о среднем для графика сходимости
-        if self.average_data:
+        if self.average_progression:
             self.save_average_progression_data()
             self.console.print(f"\n[blue]{get_text(self.language, 'average_convergence_chart', path='average_convergence.html')}[/blue]")
             self.console.print(f"[blue]{get_text(self.language, 'average_progression_data', csv='average_progression.csv', json='.json')}[/blue]")
@@ -924,20 +2442,22 @@ class YouTubeAnalyzer:
         summary_table.add_column(get_text(self.language, 'value'), style="green")
         
         summary_table.add_row(get_text(self.language, 'total_videos_in_history'), str(watch_stats['total_videos']))
-        summary_table.add_row(get_text(self.language, 'total_videos_in_history'), str(len(self.video_durations)))
-        summary_table.add_row(get_text(self.language, 'videos_without_duration'), str(watch_stats['total_videos'] - len(self.video_durations)))
+        summary_table.add_row(get_text(self.language, 'total_videos_with_duration'), str(len(self.video_durations)))
+        summary_table.add_row(get_text(self.language, 'videos_without_duration'), str(watch_stats['unknown_watches']))
         summary_table.add_row(get_text(self.language, 'total_time_known'), watch_stats['total_duration_formatted'])
         summary_table.add_row(get_text(self.language, 'average_duration_videos'), watch_stats['avg_duration_formatted'])
         summary_table.add_row(get_text(self.language, 'estimated_total_time'), watch_stats['estimated_total_time_formatted'])
+        summary_table.add_row(get_text(self.language, 'confidence_interval'), watch_stats['confidence_interval_formatted'])
         
         self.console.print(summary_table)
         
         # Дополнительная информация
-        if watch_stats['total_videos'] > len(self.video_durations):
-            coverage_percent = (len(self.video_durations) / watch_stats['total_videos']) * 100
-            self.console.print(f"\n[blue]📊 {get_text(self.language, 'data_coverage', percent=coverage_percent)}[/blue]")
-            self.console.print(f"[yellow]⚠️ {get_text(self.language, 'duration_unknown_warning', count=watch_stats['total_videos'] - len(self.video_durations))}[/yellow]")
+        if watch_stats['unknown_watches'] > 0:
+            self.console.print(f"\n[blue]📊 {get_text(self.language, 'data_coverage', percent=watch_stats['coverage_percent'])}[/blue]")
+            self.console.print(f"[yellow]⚠️ {get_text(self.language, 'duration_unknown_warning', count=watch_stats['unknown_watches'])}[/yellow]")
             self.console.print(f"[yellow]   {get_text(self.language, 'estimated_time_note')}[/yellow]")
+            if self.sampling_strata:
+                self.console.print(f"[blue]   {get_text(self.language, 'stratified_estimate_note', strata=get_text(self.language, 'strata_' + self.sampling_strata))}[/blue]")
     
     def calculate_total_watch_time(self) -> dict:
         """Вычисляет общее время просмотра за исследуемый период"""
@@ -949,36 +2469,42 @@ class YouTubeAnalyzer:
                 'avg_duration': 0,
                 'avg_duration_formatted': f'0 {get_text(self.language, "minutes")}',
                 'estimated_total_time': 0,
-                'estimated_total_time_formatted': f'0 {get_text(self.language, "hours_minutes")}'
+                'estimated_total_time_formatted': f'0 {get_text(self.language, "hours_minutes")}',
+                'unknown_watches': 0,
+                'estimated_total_margin': 0,
+                'confidence_interval_formatted': f'0 {get_text(self.language, "hours_minutes")}',
+                'coverage_percent': 0
             }
         
-        # Время для видео с известной длительностью
-        known_durations = list(self.video_durations.values())
-        total_known_duration = sum(known_durations)
-        total_known_videos = len(known_durations)
+        # Длительность переносим на все просмотры: повторный просмотр тоже занимает время
+        watch_durations = self.df['video_id'].map(self.video_durations)
+        known_watches = int(watch_durations.notna().sum())
+        total_known_duration = int(watch_durations.sum())
         total_videos = len(self.df)
+        unknown_watches = total_videos - known_watches
         
-        # Оценка общего времени (предполагаем, что неизвестные видео имеют среднюю длительность)
-        if total_known_videos > 0:
-            avg_duration = total_known_duration / total_known_videos
-            unknown_videos = total_videos - total_known_videos
-            estimated_unknown_duration = unknown_videos * avg_duration
-            estimated_total_duration = total_known_duration + estimated_unknown_duration
-        else:
-            estimated_total_duration = 0
-            avg_duration = 0
+        avg_duration = self.duration_stats.mean
+        
+        # Оценка общего времени: неизвестные просмотры получают среднюю длительность своей страты
+        estimated_total_duration, standard_error = self.estimate_total_watch_time()
+        margin = CONFIDENCE_Z * standard_error
+        interval_low = max(total_known_duration, estimated_total_duration - margin)
+        interval_high = estimated_total_duration + margin
         
-        # Вычисляем процент покрытия
-        coverage_percent = (total_known_videos / total_videos * 100) if total_videos > 0 else 0
+        # Вычисляем процент покрытия по просмотрам
+        coverage_percent = (known_watches / total_videos * 100) if total_videos > 0 else 0
         
         return {
             'total_videos': total_videos,
+            'unknown_watches': unknown_watches,
             'total_duration': total_known_duration,
             'total_duration_formatted': self.format_duration(total_known_duration),
             'avg_duration': avg_duration,
             'avg_duration_formatted': self.format_duration(avg_duration),
             'estimated_total_time': estimated_total_duration,
             'estimated_total_time_formatted': self.format_duration(estimated_total_duration),
+            'estimated_total_margin': margin,
+            'confidence_interval_formatted': f"{self.format_duration(interval_low)} — {self.format_duration(interval_high)}",
             'coverage_percent': coverage_percent
         }
     
@@ -1009,44 +2535,64 @@ class YouTubeAnalyzer:
         if not self.video_durations:
             return
         
-        # Создаем DataFrame с длительностями
-        durations_data = []
-        for video_id, duration in self.video_durations.items():
-            video_row = self.df[self.df['video_id'] == video_id]
-            if not video_row.empty:
-                row = video_row.iloc[0]
-                durations_data.append({
-                    'video_id': video_id,
-                    'title': row['title'],
-                    'channel': row['channel'],
-                    'url': row['url'],
-                    'duration_seconds': duration,
-                    'duration_formatted': f"{duration // 60}:{duration % 60:02d}",
-                    'timestamp': row['timestamp'],
-                    'source': row.get('source', 'unknown')
-                })
-        
-        if durations_data:
-            durations_df = pd.DataFrame(durations_data)
+        # Одно соединение длительностей с первым просмотром каждого видео вместо поиска по всей таблице для каждого ID
+        durations = pd.Series(self.video_durations, name='duration_seconds').rename_axis('video_id')
+        first_views = self.df.drop_duplicates('video_id').set_index('video_id')
+        durations = durations[durations.index.isin(first_views.index)]
+        
+        if len(durations) > 0:
+            rows = first_views.loc[durations.index].reset_index()
+            seconds = durations.reset_index(drop=True)
+            urls = rows['video_id'].map(make_video_url)
+            if 'url' in rows.columns:
+                urls = rows['url'].where(rows['url'].astype(bool), urls)
+            
+            durations_df = pd.DataFrame({
+                'video_id': rows['video_id'],
+                'title': rows['title'],
+                'channel': rows['channel'],
+                'url': urls,
+                'duration_seconds': seconds,
+                'duration_formatted': (seconds // 60).astype(str) + ':' + (seconds % 60).astype(str).str.zfill(2),
+                'timestamp': rows['timestamp'],
+                'source': rows['source'] if 'source' in rows.columns else 'unknown'
+            })
             csv_path = self.output_dir / "video_durations.csv"
             durations_df.to_csv(csv_path, index=False, encoding='utf-8-sig')
             
             self.console.print(f"\n[green]✓ {get_text(self.language, 'duration_saved', path=csv_path)}[/green]")
             self.console.print(f"[blue]{get_text(self.language, 'file_size', size=f'{csv_path.stat().st_size / 1024:.1f} KB')}[/blue]")
     
+    def average_progression_records(self) -> List[Dict[str, Any]]:
+        """Подробные записи о сходимости среднего, собираются только при сохранении"""
+        records = []
+        for video_count, average, total_duration, duration, title in self.average_progression:
+            records.append({
+                'video_count': video_count,
+                'average_duration_seconds': average,
+                'average_duration_minutes': round(average / 60, 1),
+                'average_duration_formatted': f"{int(average // 60)}:{int(average % 60):02d}",
+                'total_duration_seconds': total_duration,
+                'current_video_duration': duration,
+                'current_video_title': title
+            })
+        return records
+    
     def save_average_progression_data(self) -> None:
         """Сохранение данных о прогрессии среднего значения длительности видео (для каждого видео)"""
-        if not self.average_data:
+        if not self.average_progression:
             return
         
+        average_data = self.average_progression_records()
+        
         # Сохраняем в JSON для удобства анализа
         json_path = self.output_dir / "average_progression.json"
         with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(self.average_data, f, ensure_ascii=False, indent=2)
+            json.dump(average_data, f, ensure_ascii=False, indent=2)
         
         # Сохраняем в CSV для удобства работы с данными
         csv_path = self.output_dir / "average_progression.csv"
-        df = pd.DataFrame(self.average_data)
+        df = pd.DataFrame(average_data)
         df.to_csv(csv_path, index=False, encoding='utf-8-sig')
         
         self.console.print(f"\n[green]{get_text(self.language, 'average_progression_saved')}[/green]")
@@ -1054,11 +2600,28 @@ class YouTubeAnalyzer:
         self.console.print(f"[blue]{get_text(self.language, 'average_progression_csv', path=csv_path)}[/blue]")
         self.console.print(f"[blue]{get_text(self.language, 'average_progression_size', size=f'{csv_path.stat().st_size / 1024:.1f} KB')}[/blue]")
     
-    def create_plots(self) -> None:
+    def cumulative_watch_time(self) -> pd.Series:
+        """Накопительное время просмотра по времени (длинный ряд прореживается до plot_max_points интервалов)"""
+        durations = self.df['video_id'].map(self.video_durations)
+        watched = pd.Series(durations.to_numpy(), index=self.df['timestamp']).dropna().sort_index(kind='stable')
+        cumulative = watched.cumsum().astype('int64')
+        
+        # Plotly сохраняет каждую точку в HTML: делим период на равные интервалы и оставляем последнюю точку каждого
+        if len(cumulative) > self.plot_max_points:
+            timestamps = cumulative.index
+            bucket_width = (timestamps[-1] - timestamps[0]) / self.plot_max_points
+            if bucket_width > pd.Timedelta(0):
+                buckets = pd.Index((timestamps - timestamps[0]) // bucket_width)
+                cumulative = cumulative[~buckets.duplicated(keep='last')]
+            else:
+                cumulative = cumulative.iloc[-1:]
+        return cumulative
+    
+    def create_plots(self) -> Dict[str, Optional[go.Figure]]:
         """Создание графиков"""
         if self.df is None or len(self.df) == 0:
             self.console.print(f"[red]{get_text(self.language, 'no_data_for_plots')}[/red]")
-            return
+            return {}
         
         self.console.print(f"[bold blue]{get_text(self.language, 'creating_plots')}[/bold blue]")
         
@@ -1084,22 +2647,13 @@ class YouTubeAnalyzer:
         
         # График 2: Накопительное время (если есть длительности)
         if self.video_durations:
-            cumulative_time = []
-            dates = []
-            total_time = 0
-            
-            for _, row in self.df.sort_values('timestamp').iterrows():
-                video_id = row['video_id']
-                if video_id in self.video_durations:
-                    total_time += self.video_durations[video_id]
-                    cumulative_time.append(total_time)
-                    dates.append(row['timestamp'])
+            cumulative = self.cumulative_watch_time()
             
-            if cumulative_time:
+            if len(cumulative) > 0:
                 fig2 = go.Figure(data=[
                     go.Scatter(
-                        x=dates,
-                        y=cumulative_time,
+                        x=cumulative.index,
+                        y=cumulative.to_numpy(),
                         mode='lines',
                         line=dict(color='#00FF00', width=3),
                         fill='tonexty'
@@ -1178,76 +2732,103 @@ class YouTubeAnalyzer:
         )
         
         # График 5: Сходимость среднего значения длительности (для каждого видео)
-        if self.average_progression:
-            # Конвертируем секунды в минуты с округлением до десятых
-            video_counts = [point[0] for point in self.average_progression]
-            avg_minutes = [round(point[1] / 60, 1) for point in self.average_progression]
-            
-            fig5 = go.Figure(data=[
+        fig5 = self.build_average_convergence_figure()
+        
+        # Сохраняем графики: plotly.js один раз кладется рядом (plotly.min.js), а не встраивается в каждый файл
+        figures = {
+            'monthly_activity': fig1,
+            'cumulative_time': fig2,
+            'day_of_week': fig3,
+            'hourly_activity': fig4,
+            'average_convergence': fig5
+        }
+        for name, fig in figures.items():
+            if fig:
+                fig.write_html(self.output_dir / f"{name}.html", include_plotlyjs='directory')
+        
+        self.console.print(f"[green]✓ {get_text(self.language, 'plots_saved')}[/green]")
+        return figures
+    
+    def build_average_convergence_figure(self) -> Optional[go.Figure]:
+        """График сходимости среднего значения длительности со скользящим трендом"""
+        if not self.average_progression:
+            return None
+        
+        # Конвертируем секунды в минуты с округлением до десятых
+        video_counts = pd.Series([point[0] for point in self.average_progression])
+        avg_minutes = pd.Series([point[1] for point in self.average_progression]).div(60).round(1)
+        
+        # Вычисляем скользящий тренд (окно = 10% от общего количества видео, минимум 5)
+        window_size = max(5, len(video_counts) // 10)
+        moving_averages = None
+        if window_size > 1 and len(video_counts) > window_size:
+            moving_averages = avg_minutes.rolling(window_size, min_periods=1).mean().round(1)
+        
+        # Тренд считаем по всем точкам, а на график выводим не больше plot_max_points (первая и последняя сохраняются)
+        if len(video_counts) > self.plot_max_points:
+            positions = np.unique(np.linspace(0, len(video_counts) - 1, self.plot_max_points).round().astype(int))
+            video_counts = video_counts.iloc[positions]
+            avg_minutes = avg_minutes.iloc[positions]
+            if moving_averages is not None:
+                moving_averages = moving_averages.iloc[positions]
+        
+        fig = go.Figure(data=[
+            go.Scatter(
+                x=video_counts.to_numpy(),
+                y=avg_minutes.to_numpy(),
+                mode='lines+markers',
+                line=dict(color='#FF8C00', width=3),
+                marker=dict(size=6, color='#FF8C00'),
+                name=get_text(self.language, 'average_value')
+            )
+        ])
+        
+        if moving_averages is not None:
+            # Добавляем линию скользящего тренда
+            fig.add_trace(
                 go.Scatter(
-                    x=video_counts,
-                    y=avg_minutes,
-                    mode='lines+markers',
-                    line=dict(color='#FF8C00', width=3),
-                    marker=dict(size=6, color='#FF8C00'),
-                    name=get_text(self.language, 'average_value')
-                )
-            ])
-            
-            # Вычисляем скользящий тренд (окно = 10% от общего количества видео, минимум 5)
-            window_size = max(5, len(video_counts) // 10)
-            if window_size > 1 and len(video_counts) > window_size:
-                # Вычисляем скользящее среднее
-                moving_averages = []
-                for i in range(len(video_counts)):
-                    start_idx = max(0, i - window_size + 1)
-                    end_idx = i + 1
-                    window_avg = sum(avg_minutes[start_idx:end_idx]) / len(avg_minutes[start_idx:end_idx])
-                    moving_averages.append(round(window_avg, 1))
-                
-                # Добавляем линию скользящего тренда
-                fig5.add_trace(
-                    go.Scatter(
-                        x=video_counts,
-                        y=moving_averages,
-                        mode='lines',
-                        line=dict(color='red', width=2, dash='dash'),
-                        name=get_text(self.language, 'average_convergence_trend', window=window_size)
-                    )
+                    x=video_counts.to_numpy(),
+                    y=moving_averages.to_numpy(),
+                    mode='lines',
+                    line=dict(color='red', width=2, dash='dash'),
+                    name=get_text(self.language, 'average_convergence_trend', window=window_size)
                 )
-            
-            # Добавляем горизонтальную линию финального среднего для сравнения
-            final_avg_minutes = round(self.average_progression[-1][1] / 60, 1) if self.average_progression else 0
-            if final_avg_minutes > 0:
-                fig5.add_hline(
-                    y=final_avg_minutes,
-                    line_dash="dot",
-                    line_color="gray",
-                    line_width=1,
-                    annotation_text=get_text(self.language, 'average_convergence_final', value=final_avg_minutes),
-                    annotation_position="bottom right"
-                )
-            
-            fig5.update_layout(
-                title=get_text(self.language, 'average_convergence_title'),
-                xaxis_title=get_text(self.language, 'average_convergence_xaxis'),
-                yaxis_title=get_text(self.language, 'average_convergence_yaxis'),
-                template='plotly_white',
-                showlegend=True
             )
-        else:
-            fig5 = None
         
-        # Сохраняем графики
-        fig1.write_html(self.output_dir / "monthly_activity.html")
-        if fig2:
-            fig2.write_html(self.output_dir / "cumulative_time.html")
-        fig3.write_html(self.output_dir / "day_of_week.html")
-        fig4.write_html(self.output_dir / "hourly_activity.html")
-        if fig5:
-            fig5.write_html(self.output_dir / "average_convergence.html")
+        # Добавляем горизонтальную линию финального среднего для сравнения
+        final_avg_minutes = round(self.average_progression[-1][1] / 60, 1)
+        if final_avg_minutes > 0:
+            fig.add_hline(
+                y=final_avg_minutes,
+                line_dash="dot",
+                line_color="gray",
+                line_width=1,
+                annotation_text=get_text(self.language, 'average_convergence_final', value=final_avg_minutes),
+                annotation_position="bottom right"
+            )
         
-        self.console.print(f"[green]✓ {get_text(self.language, 'plots_saved')}[/green]")
+        fig.update_layout(
+            title=get_text(self.language, 'average_convergence_title'),
+            xaxis_title=get_text(self.language, 'average_convergence_xaxis'),
+            yaxis_title=get_text(self.language, 'average_convergence_yaxis'),
+            template='plotly_white',
+            showlegend=True
+        )
+        return fig
+    
+    def report_plotlyjs_tag(self) -> str:
+        """Подключение plotly.js к отчету — один раз на всю страницу"""
+        if self.report_chart_mode != 'inline':
+            return ""
+        if self.report_embed_plotlyjs:
+            return f'<script type="text/javascript">{get_plotlyjs()}</script>'
+        return '<script src="plotly.min.js"></script>'
+    
+    def render_report_chart(self, name: str, fig: go.Figure) -> str:
+        """График для отчета: div прямо в странице или iframe на отдельный файл"""
+        if self.report_chart_mode == 'inline':
+            return fig.to_html(full_html=False, include_plotlyjs=False, default_height='500px')
+        return f'<iframe src="{name}.html"></iframe>'
     
     def generate_html_report(self, stats: Dict[str, Any]) -> None:
         """Генерация HTML отчета"""
@@ -1255,7 +2836,26 @@ class YouTubeAnalyzer:
         
         # Автоматически создаем графики
         self.console.print(f"[blue]{get_text(self.language, 'creating_plots')}[/blue]")
-        self.create_plots()
+        figures = self.create_plots()
+        
+        chart_sections = [
+            ('monthly_activity', f"📈 {get_text(self.language, 'monthly_activity')}"),
+            ('day_of_week', f"📅 {get_text(self.language, 'day_of_week_activity')}"),
+            ('hourly_activity', f"🕐 {get_text(self.language, 'hourly_activity')}"),
+            ('average_convergence', get_text(self.language, 'average_convergence_section'))
+        ]
+        charts_html = ""
+        for name, title in chart_sections:
+            if figures.get(name) is None:
+                continue
+            charts_html += f"""
+        <div class="section">
+            <h2>{title}</h2>
+            <div class="chart-container">
+                {self.render_report_chart(name, figures[name])}
+            </div>
+        </div>
+"""
         
         html_content = f"""
 <!DOCTYPE html>
@@ -1347,6 +2947,7 @@ class YouTubeAnalyzer:
             font-size: 1.5em;
         }}
     </style>
+    {self.report_plotlyjs_tag()}
 </head>
 <body>
     <div class="container">
@@ -1371,34 +2972,7 @@ class YouTubeAnalyzer:
             </div>
         </div>
         
-        <div class="section">
-            <h2>📈 {get_text(self.language, 'monthly_activity')}</h2>
-            <div class="chart-container">
-                <iframe src="monthly_activity.html"></iframe>
-            </div>
-        </div>
-        
-        <div class="section">
-            <h2>📅 {get_text(self.language, 'day_of_week_activity')}</h2>
-            <div class="chart-container">
-                <iframe src="day_of_week.html"></iframe>
-            </div>
-        </div>
-        
-        <div class="section">
-            <h2>🕐 {get_text(self.language, 'hourly_activity')}</h2>
-            <div class="chart-container">
-                <iframe src="hourly_activity.html"></iframe>
-            </div>
-        </div>
-        
-        <div class="section">
-            <h2>{get_text(self.language, 'average_convergence_section')}</h2>
-            <div class="chart-container">
-                <iframe src="average_convergence.html"></iframe>
-            </div>
-        </div>
-        
+        {charts_html}
         <div class="section">
             <h2>🏆 {get_text(self.language, 'top_channels')}</h2>
             <div class="top-channels">
@@ -1432,7 +3006,7 @@ class YouTubeAnalyzer:
                     <div class="stat-label">{get_text(self.language, 'videos_with_duration')}</div>
                 </div>
                 <div class="stat-card">
-                    <div class="stat-number">{watch_stats['total_videos'] - len(self.video_durations):,}</div>
+                    <div class="stat-number">{watch_stats['unknown_watches']:,}</div>
                     <div class="stat-label">{get_text(self.language, 'videos_without_duration')}</div>
                 </div>
                 <div class="stat-card">
@@ -1455,6 +3029,10 @@ class YouTubeAnalyzer:
                     <div class="stat-number">{watch_stats['estimated_total_time_formatted']}</div>
                     <div class="stat-label">{get_text(self.language, 'estimated_total_time')}</div>
                 </div>
+                <div class="stat-card">
+                    <div class="stat-number">{watch_stats['confidence_interval_formatted']}</div>
+                    <div class="stat-label">{get_text(self.language, 'confidence_interval')}</div>
+                </div>
             </div>
 """
         else:
@@ -1504,6 +3082,10 @@ class YouTubeAnalyzer:
         # Создаем копию DataFrame для экспорта
         export_df = self.df.copy()
         
+        # В компактной схеме ссылки восстанавливаются по video_id
+        if 'url' not in export_df.columns:
+            export_df['url'] = WATCH_URL_PREFIX + export_df['video_id']
+        
         # Получаем названия колонок для текущего языка
         csv_columns = get_csv_columns(self.language)
         
@@ -1657,11 +3239,68 @@ class YouTubeAnalyzer:
         self.console.print(f"🎯 {get_text(self.language, 'unique_channels')}: {export_df[csv_columns['channel']].nunique()}")
         self.console.print(f"📁 {get_text(self.language, 'file_ready_for_import')}")
     
+    def build_columnar_frame(self) -> pd.DataFrame:
+        """Обработанная история с длительностями: стабильные английские имена колонок и строгие типы"""
+        df = self.df
+        urls = df['url'] if 'url' in df.columns else WATCH_URL_PREFIX + df['video_id']
+        dates = df['timestamp'].dt.normalize()
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        
+        return pd.DataFrame({
+            'video_id': df['video_id'].astype('string'),
+            'title': df['title'].astype('string'),
+            'channel': df['channel'].astype('category'),
+            'url': urls.astype('string'),
+            'source': df['source'].astype('category'),
+            'timestamp': df['timestamp'],
+            'date': dates,
+            'year': df['year'].astype('int16'),
+            'month': df['month'].astype('int8'),
+            'hour': df['hour'].astype('int8'),
+            'day_of_week': df['day_of_week'].astype(pd.CategoricalDtype(DAY_NAMES, ordered=True)),
+            'duration_seconds': df['video_id'].map(self.video_durations).astype('Int32')
+        })
+    
+    def export_columnar(self, file_format: str = 'parquet') -> None:
+        """Экспорт в Parquet или Arrow IPC (Feather): чтение без разбора текста и с выбором колонок"""
+        if self.df is None or len(self.df) == 0:
+            self.console.print(f"[red]{get_text(self.language, 'no_data_for_export')}[/red]")
+            return
+        
+        try:
+            import pyarrow as pa
+            import pyarrow.feather as feather
+            import pyarrow.parquet as pq
+            
+            self.console.print(f"[bold blue]{get_text(self.language, 'exporting_columnar', format=file_format)}[/bold blue]")
+            
+            table = pa.Table.from_pandas(self.build_columnar_frame(), preserve_index=False)
+            # Дата хранится как date32, а не как метка времени полуночи
+            date_index = table.schema.get_field_index('date')
+            table = table.set_column(date_index, 'date', table.column('date').cast(pa.date32()))
+            
+            if file_format == 'feather':
+                path = self.output_dir / "youtube_history.feather"
+                feather.write_feather(table, path)
+            else:
+                path = self.output_dir / "youtube_history.parquet"
+                pq.write_table(table, path)
+            
+            self.console.print(f"[green]✓ {get_text(self.language, 'columnar_saved', path=path, rows=table.num_rows)}[/green]")
+            self.console.print(f"[blue]{get_text(self.language, 'file_size', size=f'{path.stat().st_size / 1024 / 1024:.1f} MB')}[/blue]")
+        except ImportError:
+            self.console.print(f"[red]{get_text(self.language, 'pyarrow_not_installed')}[/red]")
+    
     def generate_statistics(self) -> Dict[str, Any]:
-        """Генерация статистики"""
+        """Генерация статистики (пересчитывается только после изменения данных)"""
         if self.df is None or len(self.df) == 0:
             return {}
         
+        return self.aggregate('statistics', self.compute_statistics)
+    
+    def compute_statistics(self) -> Dict[str, Any]:
+        """Вычисление статистики по всему DataFrame"""
         # Основная статистика
         total_videos = len(self.df)
         date_range = self.df['timestamp'].max() - self.df['timestamp'].min()
@@ -1738,6 +3377,7 @@ class YouTubeAnalyzer:
             self.console.print(get_text(self.language, 'menu_option_3'))
             self.console.print(get_text(self.language, 'menu_option_4'))
             self.console.print(get_text(self.language, 'menu_option_5'))
+            self.console.print(get_text(self.language, 'menu_option_6'))
             self.console.print(get_text(self.language, 'menu_option_0'))
             
             choice = input(f"\n{get_text(self.language, 'enter_choice')}").strip()
@@ -1750,8 +3390,14 @@ class YouTubeAnalyzer:
             elif choice == "2":
                 if self.df is not None:
                     sample_size = input(get_text(self.language, 'sample_size_prompt')).strip()
-                    sample_size = int(sample_size) if sample_size.isdigit() else 100
-                    self.get_durations(sample_size)
+                    strata = None
+                    if sample_size.lower() in ('all', 'все'):
+                        sample_size = None
+                    else:
+                        sample_size = int(sample_size) if sample_size.isdigit() else 100
+                        strata = input(get_text(self.language, 'strata_prompt')).strip().lower()
+                        strata = strata if strata in SAMPLING_STRATA else None
+                    self.get_durations(sample_size, strata)
                 else:
                     self.console.print(f"[red]{get_text(self.language, 'no_data_loaded')}[/red]")
             elif choice == "3":
@@ -1772,6 +3418,12 @@ class YouTubeAnalyzer:
                     webbrowser.open(f"file://{report_path.absolute()}")
                 else:
                     self.console.print(f"[red]{get_text(self.language, 'report_not_created')}[/red]")
+            elif choice == "6":
+                if self.df is not None:
+                    file_format = input(get_text(self.language, 'columnar_format_prompt')).strip().lower()
+                    self.export_columnar('feather' if file_format in ('feather', 'arrow') else 'parquet')
+                else:
+                    self.console.print(f"[red]{get_text(self.language, 'no_data_loaded')}[/red]")
             else:
                 self.console.print(f"[red]{get_text(self.language, 'invalid_choice')}[/red]")
             
@@ -1782,36 +3434,127 @@ class YouTubeAnalyzer:
         """Меню загрузки данных из Takeout"""
         self.console.print(f"\n[bold blue]{get_text(self.language, 'loading_data')}[/bold blue]")
         
-        # Автоматический поиск файлов
-        history_file = Path("Takeout/YouTube and YouTube Music/history/watch-history.json")
-        activity_file = Path("Takeout/My Activity/YouTube/MyActivity.json")
-        
-        loaded_any = False
+        # Автоматический поиск файлов во всех выгрузках (аккаунты, даты): папки Takeout* и архивы takeout-*.zip
+        selected_sources = []
         
-        if history_file.exists():
+        for history_file in find_takeout_files((TAKEOUT_HISTORY_FILE, TAKEOUT_HISTORY_HTML_FILE)):
             self.console.print(f"[green]{get_text(self.language, 'found_history_file', path=history_file)}[/green]")
             if Confirm.ask(get_text(self.language, 'load_watch_history')):
-                if self.load_data_source(str(history_file), 'watch_history'):
-                    loaded_any = True
+                selected_sources.append((history_file, 'watch_history'))
         
-        if activity_file.exists():
+        for activity_file in find_takeout_files((TAKEOUT_ACTIVITY_FILE, TAKEOUT_ACTIVITY_HTML_FILE)):
             self.console.print(f"[green]{get_text(self.language, 'found_my_activity', path=activity_file)}[/green]")
             if Confirm.ask(get_text(self.language, 'load_watch_history')):
-                if self.load_data_source(str(activity_file), 'my_activity'):
-                    loaded_any = True
+                selected_sources.append((activity_file, 'my_activity'))
+        
+        if not selected_sources:
+            self.console.print(f"[red]{get_text(self.language, 'no_files_loaded')}[/red]")
+            return
+        
+        # Файлы не менялись с прошлой обработки — берем готовый DataFrame из снимка
+        fingerprint = self.snapshot_fingerprint(selected_sources)
+        if self.restore_snapshot(fingerprint):
+            return
+        
+        # Реестр заполняется заново: в обработку попадают ровно выбранные файлы
+        self.data_sources = {}
+        loaded_any = False
+        for file_path, source_type in selected_sources:
+            if self.load_data_source(file_path, source_type):
+                loaded_any = True
+        
+        # Файлы изменились (например, новая выгрузка Takeout) — можно дописать к снимку только новые записи,
+        # если новые файлы продолжают ту же историю, а не относятся к другому аккаунту
+        base, since = None, None
+        snapshot_base = self.history_snapshot.load_base(fingerprint) if loaded_any else None
+        if snapshot_base is not None:
+            df, boundary = snapshot_base
+            if not self.continues_snapshot(selected_sources, fingerprint, df, boundary):
+                self.console.print(f"[yellow]{get_text(self.language, 'incremental_no_overlap')}[/yellow]")
+            elif Confirm.ask(get_text(self.language, 'incremental_prompt', count=len(df), since=boundary['high_water'].replace('T', ' ')), default=True):
+                base, since = snapshot_base
         
         if loaded_any:
-            self.process_data()
+            try:
+                self.process_data(base, since)
+                self.history_snapshot.save(self.df, fingerprint, self.history_boundary)
+            except Exception as e:
+                # Потоковые источники, архивы и пул процессов читаются только на этапе обработки:
+                # битый JSON, UTF-8 или zip и сбой воркера не должны завершать программу
+                self.console.print(f"[red]{get_text(self.language, 'error_loading_file', error=e)}[/red]")
         else:
             self.console.print(f"[red]{get_text(self.language, 'no_files_loaded')}[/red]")
+    
+    def continues_snapshot(self, sources: List[Tuple[str, str]], fingerprint: Dict[str, Any],
+                           df: pd.DataFrame, boundary: Dict[str, Any]) -> bool:
+        """Каждый измененный источник пересекается со снимком у его границы, то есть продолжает ту же историю"""
+        for index in self.history_snapshot.changed_sources(fingerprint):
+            file_path, source_type = sources[index]
+            if file_path not in self.data_sources:
+                # Файл не загрузился — в обработку он и так не попадет
+                continue
+            _, data = self.data_sources[file_path]
+            candidates = boundary_candidates(data, source_type, boundary['high_water'])
+            if not candidates:
+                return False
+            
+            # Ищем записи источника среди записей снимка с того же времени и позже
+            times = parse_takeout_timestamps([timestamp for timestamp, _ in candidates])
+            recent = df[df['timestamp'] >= pd.Timestamp(times.min(), tz='UTC')]
+            known = set(zip(recent['video_id'], recent['timestamp'].values.view(np.int64)))
+            if not any((video_id, moment) in known for (_, video_id), moment in zip(candidates, times)):
+                return False
+        return True
+    
+    def snapshot_fingerprint(self, sources: List[Tuple[str, str]]) -> Optional[Dict[str, Any]]:
+        """Отпечаток выбранных источников с настройками, влияющими на обработку"""
+        return HistorySnapshot.fingerprint(sources, {'compact_schema': self.compact_schema})
+    
+    def restore_snapshot(self, fingerprint: Optional[Dict[str, Any]] = None) -> bool:
+        """Загрузка обработанной истории из снимка (без отпечатка — для источников прошлого запуска)"""
+        if fingerprint is None:
+            meta = self.history_snapshot.read_meta()
+            if meta is None:
+                return False
+            sources = [(source['path'], source['source_type']) for source in meta.get('fingerprint', {}).get('sources', [])]
+            if not sources:
+                return False
+            fingerprint = self.snapshot_fingerprint(sources)
+        
+        df = self.history_snapshot.load(fingerprint)
+        if df is None:
+            return False
+        
+        self.df = df
+        self.mark_data_changed()
+        self.console.print(f"[green]✓ {get_text(self.language, 'snapshot_loaded', count=len(df))}[/green]")
+        return True
+
+def parse_arguments() -> argparse.Namespace:
+    """Параметры командной строки: настройки обработки, которых нет в меню"""
+    parser = argparse.ArgumentParser(description='YouTube History Analyzer')
+    parser.add_argument('--compact-schema', action='store_true',
+                        help='store the history in a compact schema: categories, narrow integers, no url column')
+    parser.add_argument('--report-charts', choices=REPORT_CHART_MODES, default='inline',
+                        help='report charts: inline divs in report.html (default) or iframes of the separate chart files')
+    parser.add_argument('--embed-plotlyjs', action='store_true',
+                        help='embed plotly.js into report.html to get a self-contained file instead of loading plotly.min.js')
+    return parser.parse_args()
+
 
 def main():
     """Главная функция"""
+    args = parse_arguments()
     analyzer = YouTubeAnalyzer()
+    analyzer.compact_schema = args.compact_schema
+    analyzer.report_chart_mode = args.report_charts
+    analyzer.report_embed_plotlyjs = args.embed_plotlyjs
     
     try:
         # Сначала выбираем язык
         analyzer.select_language()
+        # Если исходные файлы не менялись, история открывается из снимка без повторной обработки
+        analyzer.restore_snapshot()
         # Затем показываем TUI
         analyzer.show_tui()
     except KeyboardInterrupt: